@@ -0,0 +1,464 @@
+# benchmark.py
+#
+# Drives OverlayWindow with synthetic hits on the offscreen Qt platform and
+# reports how much it costs to keep up. Needs no display:
+#
+#   python benchmark.py --rates 10,100,500 --duration 10
+#   python benchmark.py --mode compact --json after.json --compare before.json
+#   python benchmark.py --rates '' --history 1000000
+#   python benchmark.py --rates 20 --monsters 1 --duration 60 --check
+
+import os
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from PyQt5 import QtCore
+from PyQt5.QtCore import QEvent, Qt
+from PyQt5.QtWidgets import QApplication
+from config import Config
+from metrics import latency
+from utils import load_custom_fonts, process_rss_bytes
+from event_history import EventHistory, HistoryQuery
+from ui.overlay_window import OverlayWindow
+from ui.group_indicator import MAX_GROUP_ROWS
+
+MONSTER_NAMES = [
+    'a gnoll pup', 'an orc pawn', 'a decaying skeleton', 'a large rat', 'a fire beetle',
+    'a snake', 'a kobold runt', 'a bat', 'a giant wasp drone', 'a moss snake',
+    'Lord Doljonijiarnimorinar', 'a goblin whelp', 'a young kodiak', 'a treant', 'an evil eye',
+]
+
+# Event-loop lag is measured by a timer this often
+LOOP_PROBE_INTERVAL_MS = 10
+
+# How often live widgets, groups and RSS are sampled
+SAMPLE_INTERVAL_MS = 500
+
+# History benchmark: events per write() call, the span of game time they are
+# spread over, and how often each query is timed
+HISTORY_BATCH = 20
+HISTORY_SPAN = 6 * 3600
+HISTORY_QUERY_RUNS = 5
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values):
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else 0.0,
+        'p50': percentile(values, 0.50),
+        'p95': percentile(values, 0.95),
+        'p99': percentile(values, 0.99),
+        'max': max(values) if values else 0.0,
+    }
+
+
+class BenchmarkApp(QApplication):
+    # Times every backing-store flush of a window, which is where Qt paints
+    # the dirty widgets of a frame
+    def __init__(self, argv):
+        super().__init__(argv)
+        self.frame_times = None
+
+    def notify(self, receiver, event):
+        if self.frame_times is None or event.type() != QEvent.UpdateRequest:
+            return super().notify(receiver, event)
+        started = time.perf_counter()
+        result = super().notify(receiver, event)
+        self.frame_times.append((time.perf_counter() - started) * 1000)
+        return result
+
+
+class EventSource:
+    # Synthetic hits shaped like LogHandler's output
+    def __init__(self, config: Config, monsters, seed):
+        self.random = random.Random(seed)
+        self.monsters = [MONSTER_NAMES[i % len(MONSTER_NAMES)] + ('' if i < len(MONSTER_NAMES) else f' {i}')
+                         for i in range(monsters)]
+        self.spells = config.spells
+
+    def batch(self, size):
+        events = []
+        for _ in range(size):
+            spell = self.random.choice(self.spells)
+            monster_name = self.random.choice(self.monsters)
+            category = spell.get('category', 'damage')
+            if spell.get('message_template'):
+                events.append({
+                    'type': 'special',
+                    'spell_name': spell['spell_name'],
+                    'message': spell['message_template'].format(monster_name=monster_name),
+                    'category': category,
+                    'monster_name': monster_name
+                })
+            else:
+                events.append({
+                    'type': 'damage',
+                    'spell_name': spell['spell_name'],
+                    'damage': self.random.randint(50, 1200),
+                    'category': category,
+                    'monster_name': monster_name
+                })
+        return events
+
+
+class Scenario:
+    # One run at a fixed hit rate against a fresh overlay
+    def __init__(self, app: BenchmarkApp, config: Config, args, rate, on_finished):
+        self.app = app
+        self.config = config
+        self.rate = rate
+        self.duration = args.duration
+        self.batch_interval_ms = args.batch_interval
+        self.on_finished = on_finished
+        self.source = EventSource(config, args.monsters, args.seed)
+
+        self.build_times = []
+        self.loop_lags = []
+        self.frame_times = []
+        self.samples = []
+        self.events_sent = 0
+        self.pending = 0.0
+
+        self.construct_started = time.perf_counter()
+        self.overlay = OverlayWindow(config)
+        if not self.overlay.compact:
+            self.overlay.show()
+
+        self.batch_timer = QtCore.QTimer()
+        self.batch_timer.setTimerType(Qt.PreciseTimer)
+        self.batch_timer.timeout.connect(self.send_batch)
+        self.loop_probe = QtCore.QTimer()
+        self.loop_probe.setTimerType(Qt.PreciseTimer)
+        self.loop_probe.timeout.connect(self.probe_loop)
+        self.sample_timer = QtCore.QTimer()
+        self.sample_timer.timeout.connect(self.sample)
+
+    def start(self):
+        self.app.frame_times = self.frame_times
+        latency.reset()
+        self.started = time.monotonic()
+        self.last_probe = time.perf_counter()
+        self.sample()
+        self.batch_timer.start(self.batch_interval_ms)
+        self.loop_probe.start(LOOP_PROBE_INTERVAL_MS)
+        self.sample_timer.start(SAMPLE_INTERVAL_MS)
+        QtCore.QTimer.singleShot(int(self.duration * 1000), self.finish)
+
+    def send_batch(self):
+        # Carry the fractional part over so low rates still come out right
+        self.pending += self.rate * self.batch_interval_ms / 1000
+        size = int(self.pending)
+        if size == 0:
+            return
+        self.pending -= size
+        trace = latency.start()
+        events = self.source.batch(size)
+        for event in events:
+            event['trace'] = trace
+        latency.mark(trace, 'parsed')
+
+        # The connection is direct, so emit returns once show_damage has built the groups
+        started = time.perf_counter()
+        self.overlay.damage_received.emit(events)
+        self.build_times.append((time.perf_counter() - started) * 1000)
+        self.events_sent += size
+
+    def probe_loop(self):
+        now = time.perf_counter()
+        self.loop_lags.append(max(0.0, (now - self.last_probe) * 1000 - LOOP_PROBE_INTERVAL_MS))
+        self.last_probe = now
+
+    def sample(self):
+        groups = self.overlay.groups
+        self.samples.append({
+            't': round(time.monotonic() - self.started, 3),
+            'events': self.events_sent,
+            'groups': len(groups),
+            # Height the stacked groups take, and the tallest group slot
+            'stack': max((allocator.high_water for allocator in self.overlay.allocators.values()), default=0),
+            'slot': max((group.slot_size for group in groups), default=0),
+            'oversized': sum(1 for group in groups if group.slot_size > group.max_slot_size),
+            # Indicators on screen: rows, name labels and running totals
+            'items': sum(len(group.widgets()) for group in groups),
+            'widgets': len(QApplication.allWidgets()),
+            'rss': process_rss_bytes(),
+        })
+
+    def item_limit(self):
+        # Most indicators the overlay may show whatever the hit rate: one full
+        # group per monster and category, plus each category's rollup group
+        categories = {spell.get('category', 'damage') for spell in self.config.spells}
+        return (len(self.source.monsters) + 1) * len(categories) * (MAX_GROUP_ROWS + 2)
+
+    def finish(self):
+        self.sample()
+        for timer in (self.batch_timer, self.loop_probe, self.sample_timer):
+            timer.stop()
+        self.app.frame_times = None
+        elapsed = time.monotonic() - self.started
+
+        for group in list(self.overlay.groups):
+            self.overlay.expiry.cancel(group)
+            self.overlay.retire_group(group)
+        for surface in self.overlay.surfaces.values():
+            surface.close()
+        self.overlay.close()
+        self.overlay.deleteLater()
+
+        rss = [s['rss'] for s in self.samples if s['rss'] is not None]
+        first_frame_at = self.overlay.first_frame_at
+        self.on_finished({
+            'rate': self.rate,
+            'duration': round(elapsed, 3),
+            'events_sent': self.events_sent,
+            'events_per_second': round(self.events_sent / elapsed, 1) if elapsed else 0.0,
+            'quality_level': self.overlay.governor.level_name,
+            # From constructing the overlay to its first paint; compact mode has no frame of its own
+            'first_frame_ms': (first_frame_at - self.construct_started) * 1000 if first_frame_at else None,
+            'build_ms': summarize(self.build_times),
+            'loop_lag_ms': summarize(self.loop_lags),
+            'frame_ms': summarize(self.frame_times),
+            'latency_ms': latency.snapshot(),
+            'peak_groups': max(s['groups'] for s in self.samples),
+            'peak_stack': max(s['stack'] for s in self.samples),
+            'peak_slot': max(s['slot'] for s in self.samples),
+            'oversized_groups': max(s['oversized'] for s in self.samples),
+            'peak_items': max(s['items'] for s in self.samples),
+            'item_limit': self.item_limit(),
+            'peak_widgets': max(s['widgets'] for s in self.samples),
+            'rss_start': rss[0] if rss else None,
+            'rss_peak': max(rss) if rss else None,
+            'rss_end': rss[-1] if rss else None,
+            'samples': self.samples,
+        })
+
+
+def benchmark_history(config: Config, args):
+    # Writes args.history events through EventHistory into a scratch database,
+    # then times the aggregations HistoryQuery offers over them
+    source = EventSource(config, args.monsters, args.seed)
+    directory = tempfile.mkdtemp(prefix='overlay-history-')
+    try:
+        path = os.path.join(directory, 'history.db')
+        history = EventHistory(path)
+        write_times = []
+        started_at = time.time() - HISTORY_SPAN
+        started = time.perf_counter()
+        for written in range(0, args.history, HISTORY_BATCH):
+            events = source.batch(min(HISTORY_BATCH, args.history - written))
+            now = started_at + HISTORY_SPAN * written / args.history
+            write_started = time.perf_counter()
+            history.write(events, now)
+            write_times.append((time.perf_counter() - write_started) * 1000)
+        queued = time.perf_counter() - started
+        history.close()
+        elapsed = time.perf_counter() - started
+
+        query = HistoryQuery(path)
+        monster = source.monsters[0]
+        queries = {}
+        for name, run in (('by_spell', lambda: query.damage_by_spell()),
+                          ('by_monster', lambda: query.damage_by_monster()),
+                          ('by_hour', lambda: query.damage_by_hour()),
+                          ('last_hour', lambda: query.damage_by_monster(time.time() - 3600)),
+                          ('monster_hits', lambda: query.monster_hits(monster))):
+            times = []
+            for _ in range(HISTORY_QUERY_RUNS):
+                query_started = time.perf_counter()
+                run()
+                times.append((time.perf_counter() - query_started) * 1000)
+            queries[name] = summarize(times)
+        query.close()
+
+        return {
+            'events': args.history,
+            'write_ms': summarize(write_times),
+            'queued_seconds': round(queued, 3),
+            'committed_seconds': round(elapsed, 3),
+            'inserts_per_second': round(args.history / elapsed, 1) if elapsed else 0.0,
+            'db_bytes': sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory)),
+            'queries_ms': queries,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def format_mb(value):
+    return 'n/a' if value is None else f"{value / (1024 * 1024):.1f} MB"
+
+
+def format_report(report, baseline=None):
+    lines = [
+        f"Overlay benchmark  {report['started']}",
+        f"  mode={report['mode']}  monsters={report['monsters']}  batch_interval={report['batch_interval_ms']} ms"
+        f"  duration={report['duration']} s  seed={report['seed']}",
+        f"  python {report['python']}  Qt {report['qt']}  {report['platform']}",
+        '',
+    ]
+    baseline_runs = {run['rate']: run for run in (baseline or {}).get('runs', [])}
+
+    for run in report['runs']:
+        before = baseline_runs.get(run['rate'])
+        lines.append(f"rate {run['rate']}/s: sent {run['events_sent']} events"
+                     f" ({run['events_per_second']}/s achieved), quality {run['quality_level']}")
+        if run.get('first_frame_ms') is not None:
+            line = f"  first frame   {run['first_frame_ms']:.1f} ms after constructing the overlay"
+            if before and before.get('first_frame_ms') is not None:
+                line += f"  ({run['first_frame_ms'] - before['first_frame_ms']:+.1f})"
+            lines.append(line)
+        for key, title in (('build_ms', 'group build'), ('loop_lag_ms', 'loop latency'), ('frame_ms', 'frame time')):
+            stats = run[key]
+            line = (f"  {title:<13} n={stats['count']:<6} mean={stats['mean']:7.2f}  p50={stats['p50']:7.2f}"
+                    f"  p95={stats['p95']:7.2f}  p99={stats['p99']:7.2f}  max={stats['max']:7.2f} ms")
+            if before:
+                line += f"  (p95 {stats['p95'] - before[key]['p95']:+.2f})"
+            lines.append(line)
+        stats = run['latency_ms']['total']
+        lines.append(f"  batch->paint  n={stats['count']:<6} mean={stats['mean']:7.2f}  p50={stats['p50']:7.2f}"
+                     f"  p95={stats['p95']:7.2f}  p99={stats['p99']:7.2f}  max={stats['max']:7.2f} ms")
+        line = (f"  live          groups<={run['peak_groups']}  widgets<={run['peak_widgets']}"
+                f"  rss {format_mb(run['rss_start'])} -> {format_mb(run['rss_end'])} (peak {format_mb(run['rss_peak'])})")
+        if before:
+            line += f"  (widgets {run['peak_widgets'] - before['peak_widgets']:+d})"
+        lines.append(line)
+        line = (f"  stack         height<={run['peak_stack']} px  tallest group {run['peak_slot']} px"
+                f"  items<={run['peak_items']} of {run['item_limit']}")
+        if run['oversized_groups']:
+            line += f"  ({run['oversized_groups']} groups over their span limit)"
+        if before and 'peak_stack' in before:
+            line += f"  (height {run['peak_stack'] - before['peak_stack']:+d})"
+        lines.append(line)
+        lines.append('')
+
+    history = report.get('history')
+    if history:
+        before = (baseline or {}).get('history')
+        line = (f"history: {history['events']} events committed in {history['committed_seconds']:.2f} s"
+                f" ({history['inserts_per_second']:.0f}/s), database {format_mb(history['db_bytes'])}")
+        if before:
+            line += f"  ({history['inserts_per_second'] - before['inserts_per_second']:+.0f}/s)"
+        lines.append(line)
+        stats = history['write_ms']
+        lines.append(f"  write()       n={stats['count']:<6} mean={stats['mean']:7.3f}  p50={stats['p50']:7.3f}"
+                     f"  p95={stats['p95']:7.3f}  p99={stats['p99']:7.3f}  max={stats['max']:7.3f} ms")
+        for name, stats in history['queries_ms'].items():
+            line = f"  {name:<13} p50={stats['p50']:8.2f}  max={stats['max']:8.2f} ms"
+            if before and name in before['queries_ms']:
+                line += f"  (p50 {stats['p50'] - before['queries_ms'][name]['p50']:+.2f})"
+            lines.append(line)
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the damage overlay offscreen with synthetic hits.')
+    parser.add_argument('--rates', default='10,50,200,1000',
+                        help='comma separated hit rates (events per second) to run, one scenario each')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--batch-interval', type=int, default=50,
+                        help='milliseconds between batches, like the log handler picking up a write')
+    parser.add_argument('--monsters', type=int, default=5, help='distinct monster names to hit')
+    parser.add_argument('--mode', choices=['fullscreen', 'compact'], default=None,
+                        help='overlay mode (defaults to the config default)')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for the synthetic hits')
+    parser.add_argument('--history', type=int, default=0,
+                        help='also write this many events to a scratch SQLite history and time queries on it')
+    parser.add_argument('--output', default='bench_output.txt', help='text report path')
+    parser.add_argument('--json', dest='json_path', default=None, help='also write the full report as JSON')
+    parser.add_argument('--compare', default=None, help='JSON report of an earlier run to show deltas against')
+    parser.add_argument('--check', action='store_true',
+                        help='exit with an error if any group grew past its span limit, or the indicators'
+                             ' on screen past what the monsters and categories allow, under the sustained hits')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    rates = [int(rate) for rate in args.rates.split(',') if rate.strip()]
+
+    app = BenchmarkApp(sys.argv[:1])
+    app.setQuitOnLastWindowClosed(False)
+
+    # Defaults rather than config.json, so runs on different machines compare
+    config = Config()
+    if args.mode:
+        config.overlay_mode = args.mode
+    load_custom_fonts(config)
+
+    report = {
+        'started': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'mode': config.overlay_mode,
+        'monsters': args.monsters,
+        'batch_interval_ms': args.batch_interval,
+        'duration': args.duration,
+        'seed': args.seed,
+        'python': platform.python_version(),
+        'qt': QtCore.QT_VERSION_STR,
+        'platform': f"{platform.system()} {platform.machine()} ({app.platformName()})",
+        'runs': [],
+    }
+    remaining = list(rates)
+    current = []  # Keeps the running scenario alive
+
+    def run_next(result=None):
+        if result is not None:
+            report['runs'].append(result)
+            print(f"rate {result['rate']}/s done: build p95 {result['build_ms']['p95']:.2f} ms,"
+                  f" loop lag p95 {result['loop_lag_ms']['p95']:.2f} ms")
+        if not remaining:
+            app.quit()
+            return
+        current[:] = [Scenario(app, config, args, remaining.pop(0),
+                               lambda result: QtCore.QTimer.singleShot(0, lambda: run_next(result)))]
+        current[0].start()
+
+    QtCore.QTimer.singleShot(0, run_next)
+    app.exec_()
+
+    if args.history:
+        report['history'] = benchmark_history(config, args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    text = format_report(report, baseline)
+    print(text)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+    if args.check:
+        failed = False
+        for run in report['runs']:
+            if run['oversized_groups']:
+                print(f"Check failed: groups outgrew their span limit at {run['rate']}/s")
+                failed = True
+            if run['peak_items'] > run['item_limit']:
+                print(f"Check failed: {run['peak_items']} indicators on screen at {run['rate']}/s,"
+                      f" more than the {run['item_limit']} the monsters and categories allow")
+                failed = True
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+# column_store.py
+#
+# Append-only columnar store of damage events for long-term analysis. Each
+# column is a file of fixed-width values, and names are kept once in a
+# dictionary. Queries map the files and aggregate them in place:
+#
+#   python column_store.py history/columns --by spell
+#   python column_store.py history/columns --by hour --since 86400
+
+import os
+import sys
+import json
+import mmap
+import time
+import argparse
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Queries fall back to plain loops over the mapped files
+
+# Column name, array typecode, numpy dtype
+COLUMNS = (
+    ('time', 'd', 'float64'),      # Wall-clock seconds
+    ('spell', 'I', 'uint32'),      # Index into the spells dictionary
+    ('monster', 'I', 'uint32'),    # Index into the monsters dictionary
+    ('damage', 'i', 'int32'),
+    ('category', 'H', 'uint16'),   # Index into the categories dictionary
+)
+DICTIONARY_FILE = 'names.json'
+DICTIONARIES = {'spell': 'spells', 'monster': 'monsters', 'category': 'categories'}
+
+
+class ColumnStore:
+    # Opened writable by the overlay; readers open it with writable=False so
+    # they never touch rows the writer has yet to flush
+    def __init__(self, directory, writable=True):
+        self.directory = directory
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+
+        self.names = {name: [] for name in DICTIONARIES.values()}
+        try:
+            with open(self.path(DICTIONARY_FILE), 'r', encoding='utf-8') as f:
+                self.names.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        self.ids = {name: {value: i for i, value in enumerate(values)} for name, values in self.names.items()}
+
+        # A write cut short leaves some columns longer than others; drop the
+        # partial row so every column lines up again
+        self.count = min(
+            os.path.getsize(self.path(name)) // array(code).itemsize if os.path.exists(self.path(name)) else 0
+            for name, code, _ in COLUMNS
+        )
+        self.files = {}
+        for name, code, _ in COLUMNS if writable else ():
+            f = open(self.path(name), 'ab')
+            f.truncate(self.count * array(code).itemsize)
+            self.files[name] = f
+
+    def path(self, name):
+        return os.path.join(self.directory, name if name == DICTIONARY_FILE else name + '.col')
+
+    def intern(self, dictionary, value):
+        ids = self.ids[dictionary]
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = ids[value] = len(self.names[dictionary])
+            self.names[dictionary].append(value)
+        return value_id
+
+    def append(self, events, now=None):
+        # Damage events only; anything else carries no numbers to aggregate
+        now = time.time() if now is None else now
+        columns = {name: array(code) for name, code, _ in COLUMNS}
+        known = sum(len(values) for values in self.names.values())
+        for event in events:
+            if event['type'] != 'damage':
+                continue
+            columns['time'].append(now)
+            columns['spell'].append(self.intern('spells', event['spell_name']))
+            columns['monster'].append(self.intern('monsters', event.get('monster_name') or ''))
+            columns['damage'].append(event['damage'])
+            columns['category'].append(self.intern('categories', event.get('category') or ''))
+        if not columns['time']:
+            return
+        # Names are saved before the rows that refer to them
+        if sum(len(values) for values in self.names.values()) != known:
+            self.save_names()
+        for name, values in columns.items():
+            values.tofile(self.files[name])
+        self.count += len(columns['time'])
+
+    def save_names(self):
+        path = self.path(DICTIONARY_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.names, f)
+        os.replace(path + '.tmp', path)
+
+    def flush(self):
+        for f in self.files.values():
+            f.flush()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+    def columns(self):
+        # Read-only views of every column over the mapped files, without
+        # copying: numpy arrays when numpy is there, memoryviews otherwise
+        self.flush()
+        views = {}
+        for name, code, dtype in COLUMNS:
+            if not self.count:
+                views[name] = np.zeros(0, dtype=dtype) if np is not None else memoryview(array(code))
+            elif np is not None:
+                views[name] = np.memmap(self.path(name), dtype=dtype, mode='r', shape=(self.count,))
+            else:
+                with open(self.path(name), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                views[name] = memoryview(mapped)[:self.count * array(code).itemsize].cast(code)
+        return views
+
+    def damage_by(self, key, since=0.0):
+        # [(name, total damage, hits, max hit)] for key 'spell', 'monster' or
+        # 'category', largest total first
+        names = self.names[DICTIONARIES[key]]
+        columns = self.columns()
+        if np is not None:
+            keys, damage = columns[key], columns['damage']
+            if since:
+                selected = columns['time'] >= since
+                keys, damage = keys[selected], damage[selected]
+            totals = np.bincount(keys, weights=damage, minlength=len(names))
+            hits = np.bincount(keys, minlength=len(names))
+            maxima = np.zeros(len(names), dtype=np.int64)
+            np.maximum.at(maxima, keys, damage)
+            rows = [(names[i], int(totals[i]), int(hits[i]), int(maxima[i])) for i in np.flatnonzero(hits)]
+        else:
+            totals = {}
+            for t, k, d in zip(columns['time'], columns[key], columns['damage']):
+                if t >= since:
+                    row = totals.get(k)
+                    if row is None:
+                        totals[k] = [d, 1, d]
+                    else:
+                        row[0] += d
+                        row[1] += 1
+                        if d > row[2]:
+                            row[2] = d
+            rows = [(names[k], total, hits, maximum) for k, (total, hits, maximum) in totals.items()]
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    def damage_by_hour(self, since=0.0):
+        # [(hour start, total damage, hits)] in time order
+        columns = self.columns()
+        if np is not None:
+            times, damage = columns['time'], columns['damage']
+            if since:
+                selected = times >= since
+                times, damage = times[selected], damage[selected]
+            hours, inverse = np.unique((times // 3600).astype(np.int64), return_inverse=True)
+            totals = np.bincount(inverse, weights=damage, minlength=len(hours))
+            hits = np.bincount(inverse, minlength=len(hours))
+            return [(int(hour) * 3600, int(totals[i]), int(hits[i])) for i, hour in enumerate(hours)]
+        totals = {}
+        for t, d in zip(columns['time'], columns['damage']):
+            if t >= since:
+                row = totals.setdefault(int(t // 3600) * 3600, [0, 0])
+                row[0] += d
+                row[1] += 1
+        return [(hour, total, hits) for hour, (total, hits) in sorted(totals.items())]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Damage totals from a column store.')
+    parser.add_argument('directory', help='column store directory')
+    parser.add_argument('--by', choices=['spell', 'monster', 'category', 'hour'], default='spell')
+    parser.add_argument('--since', type=float, default=0.0, help='only the last this many seconds')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    store = ColumnStore(args.directory, writable=False)
+    since = time.time() - args.since if args.since else 0.0
+    started = time.perf_counter()
+    if args.by == 'hour':
+        print(f"{'hour':<30} {'damage':>12} {'hits':>8}")
+        for hour, total, hits in store.damage_by_hour(since):
+            print(f"{time.strftime('%Y-%m-%d %H:00', time.localtime(hour)):<30} {total:>12} {hits:>8}")
+    else:
+        print(f"{args.by:<30} {'damage':>12} {'hits':>8} {'max':>8}")
+        for name, total, hits, maximum in store.damage_by(args.by, since):
+            print(f"{name[:30]:<30} {total:>12} {hits:>8} {maximum:>8}")
+    print(f"{store.count} events, {(time.perf_counter() - started) * 1000:.1f} ms"
+          f" ({'numpy' if np is not None else 'without numpy'})")
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
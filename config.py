@@ -1,6 +1,7 @@
 # config.py
 
 import os
+import copy
 import json
 from dataclasses import dataclass, field
 from typing import Dict, Tuple, List, Any
@@ -71,6 +72,12 @@ class Config:
         }
     ])
 
+    # Optional spell database imported on top of the spells above: CSV or JSON
+    # rows with name, category, icon, message and display, or the game's
+    # spells_us.txt. Relative icons are looked up in spell_icon_dir.
+    spell_database_path: str = ''
+    spell_icon_dir: str = 'resources/icons'
+
     # Start positions for each category
     start_positions: Dict[str, Tuple[int, int]] = field(default_factory=lambda: {
         'damage': (960, 100),
@@ -111,10 +118,37 @@ class Config:
 
     padding: int = 10                 # Padding between stacked indicators/groups
 
+    # 'fullscreen' draws on one screen-sized window; 'compact' uses one small
+    # window per category that is hidden whenever the category is idle
+    overlay_mode: str = 'fullscreen'
+
+    # Rollup Settings
+    rollup_threshold: int = 5         # Hits per second per spell before they fold into one row (0 disables)
+    rollup_scope: str = 'monster'     # 'monster' rolls up per spell on each monster, 'spell' across all monsters
+
     # Total Damage Label Appearance Settings
     total_font_ratio: float = 0.50    # Total damage font size as a ratio of FONT_SIZE
     total_color: str = 'red'          # Color for total damage text
 
+    # Idle Settings
+    idle_timeout: float = 10.0        # Seconds with nothing on screen and no events before the overlay goes idle
+
+    # Quality Governor Settings
+    frame_budget_ms: int = 20         # Event-loop lag (ms) above which animation quality is stepped down
+
+    # DPS Readout Settings
+    dps_readout: bool = False         # Show live 5s/30s/fight DPS overall and for the top monsters
+    dps_readout_position: Tuple[int, int] = (960, 20)
+
+    # History Settings
+    history_db_path: str = ''         # Keep every event in this SQLite database (relative to the script); empty disables it
+    column_store_path: str = ''       # Also append damage events to a column store in this directory; empty disables it
+    damage_stats_path: str = ''       # Merge this session's per-spell/monster damage percentiles into this file on exit
+
+    # Debug Settings
+    debug_hud: bool = False           # Start with the performance/latency HUD shown (SIGUSR1 toggles it)
+    latency_report_path: str = ''     # Write per-stage latency percentiles here on exit (.json or .csv)
+
     # Opacity Settings
     opacity: float = 1.0              # Overall opacity (0.1 to 1.0)
 
@@ -128,6 +162,9 @@ class Config:
     # Log file path absolute
     script_dir: str = field(init=False)
 
+    # Worked out at runtime rather than read from config.json
+    RUNTIME_FIELDS = ('font_family', 'config_file', 'script_dir')
+
     def __post_init__(self):
         self.script_dir = os.path.dirname(os.path.abspath(__file__))
         self.log_file_path = os.path.join(self.script_dir, self.log_file_path)
@@ -139,17 +176,46 @@ class Config:
         return {
             'log_file_path': self.log_file_path,
             'spells': self.spells,
+            'spell_database_path': self.spell_database_path,
+            'spell_icon_dir': self.spell_icon_dir,
             'start_positions': self.start_positions,
             'spell_categories': self.spell_categories,
             'animation_duration': self.animation_duration,
             'float_distance': self.float_distance,
             'padding': self.padding,
+            'overlay_mode': self.overlay_mode,
+            'rollup_threshold': self.rollup_threshold,
+            'rollup_scope': self.rollup_scope,
             'total_font_ratio': self.total_font_ratio,
             'total_color': self.total_color,
+            'idle_timeout': self.idle_timeout,
+            'frame_budget_ms': self.frame_budget_ms,
+            'dps_readout': self.dps_readout,
+            'dps_readout_position': self.dps_readout_position,
+            'history_db_path': self.history_db_path,
+            'column_store_path': self.column_store_path,
+            'damage_stats_path': self.damage_stats_path,
+            'debug_hud': self.debug_hud,
+            'latency_report_path': self.latency_report_path,
             'opacity': self.opacity,
             'font_file': self.font_file
         }
 
+    def diff(self, other):
+        # Names of the settings that differ between this config and other,
+        # compared as they would be saved so a tuple matches its JSON list
+        return {
+            name for name in self.__dataclass_fields__
+            if name not in self.RUNTIME_FIELDS
+            and json.dumps(getattr(self, name), sort_keys=True) != json.dumps(getattr(other, name), sort_keys=True)
+        }
+
+    def update_from(self, other, names):
+        # Copy the named settings over in place, so everything holding this
+        # config sees them
+        for name in names:
+            setattr(self, name, copy.deepcopy(getattr(other, name)))
+
     def save_to_file(self):
         try:
             with open(self.config_file, 'w', encoding='utf-8') as f:
@@ -161,7 +227,7 @@ class Config:
     def load_from_file(self):
         if not os.path.exists(self.config_file):
             print("Configuration file not found. Using default settings.")
-            return
+            return False
 
         try:
             with open(self.config_file, 'r', encoding='utf-8') as f:
@@ -176,6 +242,8 @@ class Config:
                 spell['icon_path'] = os.path.join(self.script_dir, os.path.relpath(spell['icon_path'], self.script_dir))
 
             print(f"Configuration loaded from {self.config_file}")
+            return True
         except Exception as e:
             print(f"Failed to load configuration: {e}")
             print("Using default settings.")
+            return False
@@ -0,0 +1,202 @@
+# config_snapshot.py
+
+import os
+import re
+import json
+import hashlib
+from config import Config
+
+# Bump when the layout of the cached data, or how it is worked out, changes
+SNAPSHOT_VERSION = 3
+SNAPSHOT_FILE = 'config_cache.json'
+
+# Shorter literals reject too few lines to be worth the check
+MIN_LITERAL_LENGTH = 4
+
+
+def escape_length(pattern, i):
+    # Length of the escape starting at pattern[i], a backslash followed by a
+    # letter or digit: \xhh, \uhhhh, \Uhhhhhhhh, \N{name}, octal codes and
+    # backreferences take the characters after the letter too
+    escaped = pattern[i + 1]
+    if escaped in 'xuU':
+        digits = {'x': 2, 'u': 4, 'U': 8}[escaped]
+        return 2 + len(re.match(r'[0-9a-fA-F]{0,%d}' % digits, pattern[i + 2:]).group())
+    if escaped == 'N' and pattern[i + 2:i + 3] == '{':
+        close = pattern.find('}', i + 3)
+        return (close if close >= 0 else len(pattern)) + 1 - i
+    if escaped == '0':
+        return 2 + len(re.match(r'[0-7]{0,2}', pattern[i + 2:]).group())
+    if escaped.isdigit():
+        # Three octal digits are a character code, anything else a group number
+        if re.match(r'[0-7]{3}', pattern[i + 1:]):
+            return 4
+        return 2 + (1 if pattern[i + 2:i + 3].isdigit() else 0)
+    return 2
+
+
+def required_literal(pattern):
+    # Longest run of plain text that every match of pattern must contain,
+    # lowercased, or None. Only text outside groups counts, and a pattern
+    # with alternation has none, so the answer errs on the side of None.
+    if '|' in pattern or re.search(r'\(\?[a-zA-Z]*x', pattern):
+        return None
+    best = ''
+    run = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            escaped = pattern[i + 1]
+            if escaped.isalnum():
+                # A class, anchor, code or backreference ends the run
+                best = max(best, ''.join(run), key=len)
+                run = []
+                i += escape_length(pattern, i)
+                continue
+            if not depth:
+                run.append(escaped)
+            i += 2
+            continue
+        if ch == '[':
+            # Skip the whole character class
+            best = max(best, ''.join(run), key=len)
+            run = []
+            i += 2 if pattern[i + 1:i + 2] == ']' else 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+        elif ch in '*?{':
+            # The character before an optional quantifier may not be there
+            if run:
+                run.pop()
+            best = max(best, ''.join(run), key=len)
+            run = []
+            if ch == '{':
+                while i < len(pattern) and pattern[i] != '}':
+                    i += 1
+        elif ch in '()':
+            best = max(best, ''.join(run), key=len)
+            run = []
+            depth += 1 if ch == '(' else -1
+        elif ch in '.^$+':
+            best = max(best, ''.join(run), key=len)
+            run = []
+        elif not depth:
+            run.append(ch)
+        i += 1
+    best = max(best, ''.join(run), key=len).lower()
+    if len(best.strip()) < MIN_LITERAL_LENGTH or not best.isascii():
+        return None
+    return best
+
+
+def icon_stats(paths):
+    # (path, size, mtime) for each of paths that exists, from one directory
+    # listing per icon folder rather than a stat per icon
+    wanted = {}
+    for path in paths:
+        wanted.setdefault(os.path.dirname(path) or '.', set()).add(os.path.basename(path))
+    stats = []
+    for folder, names in wanted.items():
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name in names:
+                        stat = entry.stat()
+                        stats.append((os.path.join(folder, entry.name), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            pass
+    return sorted(stats)
+
+
+def fingerprint(config: Config):
+    # Hash of every setting and of the size and modification time of every
+    # icon, so editing config.json or adding, removing or replacing an icon
+    # invalidates the snapshot
+    digest = hashlib.sha1(str(SNAPSHOT_VERSION).encode())
+    digest.update(json.dumps(config.to_dict(), sort_keys=True).encode('utf-8'))
+    digest.update(json.dumps(icon_stats({spell['icon_path'] for spell in config.spells})).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ConfigSnapshot:
+    # What it takes to check and prepare a config, worked out once and kept
+    # in config_cache.json until the config changes:
+    #   spells   normalised spell table with each pattern's prefilter literal
+    #            and compile error, if any
+    #   icons    per icon file, whether it exists
+    def __init__(self, fingerprint, spells, icons):
+        self.fingerprint = fingerprint
+        self.spells = spells
+        self.icons = icons
+        self.matchers = {spell['regex_pattern']: spell for spell in spells}
+
+    @classmethod
+    def build(cls, config: Config):
+        spells = []
+        for spell in config.spells:
+            error = None
+            try:
+                re.compile(spell['regex_pattern'], re.IGNORECASE)
+            except re.error as e:
+                error = str(e)
+            spells.append({
+                'spell_name': spell['spell_name'],
+                'icon_path': spell['icon_path'],
+                'regex_pattern': spell['regex_pattern'],
+                'message_template': spell.get('message_template', None),
+                'category': spell.get('category', 'damage'),
+                'literal': None if error else required_literal(spell['regex_pattern']),
+                'error': error
+            })
+
+        icons = {path: {'exists': os.path.exists(path)} for path in {spell['icon_path'] for spell in spells}}
+        return cls(fingerprint(config), spells, icons)
+
+    @classmethod
+    def cached(cls, config: Config):
+        # The snapshot in config_cache.json if it still matches config, else None
+        config_fingerprint = fingerprint(config)
+        try:
+            with open(cls.path_for(config), 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == SNAPSHOT_VERSION and data.get('fingerprint') == config_fingerprint:
+                return cls(config_fingerprint, data['spells'], data['icons'])
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    @classmethod
+    def load(cls, config: Config):
+        # The cached snapshot if it still matches config, otherwise a fresh one
+        # that replaces it on disk
+        snapshot = cls.cached(config)
+        if snapshot is None:
+            snapshot = cls.build(config)
+            snapshot.save(cls.path_for(config))
+        return snapshot
+
+    @staticmethod
+    def path_for(config: Config):
+        return os.path.join(config.script_dir, SNAPSHOT_FILE)
+
+    def save(self, path):
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': SNAPSHOT_VERSION,
+                    'fingerprint': self.fingerprint,
+                    'spells': self.spells,
+                    'icons': self.icons
+                }, f)
+        except OSError as e:
+            print(f"Failed to save config cache: {e}")
+
+    def is_current(self, config: Config):
+        return self.fingerprint == fingerprint(config)
+
+    def missing_icons(self):
+        # The fingerprint covers the icon files, so these are still missing
+        # for as long as the snapshot is current
+        return [spell for spell in self.spells if not self.icons[spell['icon_path']]['exists']]
@@ -0,0 +1,152 @@
+# damage_stats.py
+#
+# Damage distributions per spell and per monster, kept as log-bucket
+# histograms so a whole season of hits takes the same memory as a minute.
+# Saved sketches from several sessions or logs merge into one:
+#
+#   python damage_stats.py session1.json session2.json --spell "Dooming Darkness"
+
+import os
+import sys
+import json
+import argparse
+from metrics import LogHistogram
+
+# Percentiles shown by default
+QUANTILES = (0.50, 0.90, 0.99)
+
+# Bumped when the saved layout or the bucket scale changes, since buckets
+# from different scales cannot be merged
+SKETCH_VERSION = 1
+
+
+class DamageHistogram(LogHistogram):
+    # Buckets about 4.4% wide from 1 damage up; under 320 buckets reach past
+    # a million, whatever the number of hits
+    GROWTH = 2 ** (1 / 16)
+    MINIMUM = 1.0
+
+    # Bucket of each damage value seen, shared by every histogram; hits
+    # repeat the same values, so this saves a log() per hit
+    _indexes = {}
+    INDEX_CACHE_LIMIT = 65536
+
+    def bucket_index(self, value):
+        index = self._indexes.get(value)
+        if index is None:
+            index = super().bucket_index(value)
+            if len(self._indexes) < self.INDEX_CACHE_LIMIT:
+                self._indexes[value] = index
+        return index
+
+
+class DamageSketches:
+    def __init__(self):
+        self.overall = DamageHistogram()
+        self.spells = {}
+        self.monsters = {}
+
+    def record(self, event):
+        if event['type'] == 'damage':
+            self.add(event['spell_name'], event.get('monster_name'), event['damage'])
+
+    def add(self, spell_name, monster_name, damage):
+        self.overall.record(damage)
+        for sketches, key in ((self.spells, spell_name), (self.monsters, monster_name)):
+            sketch = sketches.get(key)
+            if sketch is None:
+                sketch = sketches[key] = DamageHistogram()
+            sketch.record(damage)
+
+    def record_events(self, events):
+        for event in events:
+            self.record(event)
+
+    def merge(self, other):
+        self.overall.merge(other.overall)
+        for mine, theirs in ((self.spells, other.spells), (self.monsters, other.monsters)):
+            for key, sketch in theirs.items():
+                if key not in mine:
+                    mine[key] = DamageHistogram()
+                mine[key].merge(sketch)
+
+    def spell_quantiles(self, spell_name, fractions=QUANTILES):
+        sketch = self.spells.get(spell_name)
+        return [sketch.percentile(fraction) for fraction in fractions] if sketch else None
+
+    def monster_quantiles(self, monster_name, fractions=QUANTILES):
+        sketch = self.monsters.get(monster_name)
+        return [sketch.percentile(fraction) for fraction in fractions] if sketch else None
+
+    def to_dict(self):
+        return {
+            'version': SKETCH_VERSION,
+            'overall': self.overall.to_dict(),
+            'spells': {key: sketch.to_dict() for key, sketch in self.spells.items()},
+            'monsters': {key: sketch.to_dict() for key, sketch in self.monsters.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != SKETCH_VERSION:
+            raise ValueError(f"unsupported sketch version {data.get('version')}")
+        sketches = cls()
+        sketches.overall = DamageHistogram.from_dict(data['overall'])
+        sketches.spells = {key: DamageHistogram.from_dict(value) for key, value in data['spells'].items()}
+        sketches.monsters = {key: DamageHistogram.from_dict(value) for key, value in data['monsters'].items()}
+        return sketches
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def save(self, path):
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(path + '.tmp', path)
+
+
+def format_table(title, sketches, fractions=QUANTILES):
+    lines = [f"{title:<30} {'hits':>8} {'mean':>8} " + ' '.join(f"{'p' + format(f * 100, 'g'):>8}" for f in fractions) + f" {'max':>8}"]
+    for key, sketch in sorted(sketches.items(), key=lambda item: item[1].total, reverse=True):
+        lines.append(f"{str(key)[:30]:<30} {sketch.count:>8} {sketch.mean():>8.0f} "
+                     + ' '.join(f"{sketch.percentile(fraction):>8.0f}" for fraction in fractions)
+                     + f" {sketch.max:>8.0f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Merge saved damage sketches and print their percentiles.')
+    parser.add_argument('paths', nargs='+', help='sketch files to merge')
+    parser.add_argument('--spell', help='only this spell')
+    parser.add_argument('--monster', help='only this monster')
+    parser.add_argument('--output', help='write the merged sketches here')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    merged = DamageSketches()
+    for path in args.paths:
+        try:
+            merged.merge(DamageSketches.load(path))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Skipping '{path}': {e}")
+
+    if args.spell or args.monster:
+        sketches = {}
+        if args.spell in merged.spells:
+            sketches[args.spell] = merged.spells[args.spell]
+        if args.monster in merged.monsters:
+            sketches[args.monster] = merged.monsters[args.monster]
+        print('\n'.join(format_table('name', sketches)))
+    else:
+        print('\n'.join(format_table('all damage', {'': merged.overall})))
+        print()
+        print('\n'.join(format_table('spell', merged.spells)))
+        print()
+        print('\n'.join(format_table('monster', merged.monsters)))
+    if args.output:
+        merged.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
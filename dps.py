@@ -0,0 +1,140 @@
+# dps.py
+
+import math
+
+# Rolling windows every meter keeps, in seconds
+SHORT_WINDOW = 5
+LONG_WINDOW = 30
+
+# A meter's fight ends after this long without damage; the next hit starts a new one
+FIGHT_IDLE_GAP = 10.0
+
+
+class RollingWindow:
+    # Damage over the last `seconds` in one-second buckets on a ring, with a
+    # running sum. Each bucket is cleared at most once as time moves past it,
+    # so adding and querying are O(1) amortised however much is recorded.
+    __slots__ = ('seconds', 'buckets', 'head', 'total')
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.buckets = [0] * seconds
+        self.head = None  # Whole second of the newest bucket
+        self.total = 0
+
+    def advance(self, now):
+        second = math.floor(now)
+        if self.head is None or second - self.head >= self.seconds:
+            if self.total:
+                self.buckets = [0] * self.seconds
+                self.total = 0
+            self.head = second
+            return
+        while self.head < second:
+            self.head += 1
+            slot = self.head % self.seconds
+            self.total -= self.buckets[slot]
+            self.buckets[slot] = 0
+
+    def add(self, now, amount):
+        self.advance(now)
+        # Late hits (a second or two behind the newest) still land in their bucket
+        second = max(math.floor(now), self.head - self.seconds + 1)
+        self.buckets[second % self.seconds] += amount
+        self.total += amount
+
+    def rate(self, now):
+        self.advance(now)
+        return self.total / self.seconds
+
+
+class DpsMeter:
+    # 5 s, 30 s and whole-fight damage per second for one monster, spell or
+    # the player overall
+    __slots__ = ('short', 'long', 'fight_start', 'last_hit', 'fight_damage', 'fight_hits')
+
+    def __init__(self):
+        self.short = RollingWindow(SHORT_WINDOW)
+        self.long = RollingWindow(LONG_WINDOW)
+        self.fight_start = None
+        self.last_hit = None
+        self.fight_damage = 0
+        self.fight_hits = 0
+
+    def add(self, now, damage):
+        if self.last_hit is None or now - self.last_hit > FIGHT_IDLE_GAP:
+            self.start_fight(now)
+        self.short.add(now, damage)
+        self.long.add(now, damage)
+        self.last_hit = max(self.last_hit, now)
+        self.fight_damage += damage
+        self.fight_hits += 1
+
+    def start_fight(self, now):
+        self.fight_start = now
+        self.last_hit = now
+        self.fight_damage = 0
+        self.fight_hits = 0
+
+    def end_fight(self):
+        # The next hit starts a new fight (e.g. once the monster has died)
+        self.last_hit = None
+
+    def fight_rate(self):
+        # Over the fight so far, counting at least one second
+        if self.fight_start is None:
+            return 0.0
+        return self.fight_damage / max(1.0, self.last_hit - self.fight_start)
+
+    def rates(self, now):
+        return self.short.rate(now), self.long.rate(now), self.fight_rate()
+
+    def idle(self, now):
+        return self.last_hit is None or now - self.last_hit > max(LONG_WINDOW, FIGHT_IDLE_GAP)
+
+
+class DpsEngine:
+    # Meters for the player overall, each monster and each spell, updated as
+    # damage events come in. Meters idle for longer than the long window are
+    # dropped by prune(), so memory follows what is currently being fought.
+    def __init__(self):
+        self.overall = DpsMeter()
+        self.monsters = {}
+        self.spells = {}
+
+    def record(self, event, now):
+        if event['type'] != 'damage':
+            return
+        damage = event['damage']
+        self.overall.add(now, damage)
+        for meters, key in ((self.monsters, event.get('monster_name')), (self.spells, event['spell_name'])):
+            meter = meters.get(key)
+            if meter is None:
+                meter = meters[key] = DpsMeter()
+            meter.add(now, damage)
+
+    def record_events(self, events, now):
+        for event in events:
+            self.record(event, now)
+
+    def end_fight(self, monster_name):
+        meter = self.monsters.get(monster_name)
+        if meter is not None:
+            meter.end_fight()
+
+    def top_monsters(self, now, count=3):
+        return self.top(self.monsters, now, count)
+
+    def top_spells(self, now, count=3):
+        return self.top(self.spells, now, count)
+
+    def top(self, meters, now, count):
+        # Meters with the highest 30 s rate right now, with their rates
+        rated = [(name, meter.rates(now)) for name, meter in meters.items() if not meter.idle(now)]
+        rated.sort(key=lambda item: item[1][1], reverse=True)
+        return rated[:count]
+
+    def prune(self, now):
+        for meters in (self.monsters, self.spells):
+            for key in [key for key, meter in meters.items() if meter.idle(now)]:
+                del meters[key]
@@ -0,0 +1,147 @@
+# encounters.py
+
+import re
+from collections import deque
+from spell_db import TIMESTAMP_PREFIX
+
+# A monster's fight closes after this long without a hit on it
+ENCOUNTER_IDLE_GAP = 10.0
+
+# Closed encounters kept with their per-spell breakdown; older ones are kept
+# as summaries, and the oldest summaries are dropped
+DETAILED_ENCOUNTERS = 50
+SUMMARY_ENCOUNTERS = 5000
+
+# "You have slain a gnoll!" / "a gnoll has been slain by Soandso!"
+DEATH_LINE = re.compile(r'^(?:You have slain (.+?)|(.+?) has been slain by .+?)!$', re.IGNORECASE)
+DEATH_LITERAL = ' slain '
+
+
+def match_death(line):
+    # A death event for a line reporting a monster's death, or None
+    line = TIMESTAMP_PREFIX.sub('', line)
+    match = DEATH_LINE.match(line)
+    if not match:
+        return None
+    return {
+        'type': 'death',
+        'monster_name': match.group(1) or match.group(2),
+        'category': None
+    }
+
+
+class Encounter:
+    # One fight against one monster, updated hit by hit
+    __slots__ = ('monster_name', 'start', 'end', 'total', 'hits', 'max_hit', 'spells', 'ended_by')
+
+    def __init__(self, monster_name, start):
+        self.monster_name = monster_name
+        self.start = start
+        self.end = start
+        self.total = 0
+        self.hits = 0
+        self.max_hit = 0
+        self.spells = {}  # spell_name -> [total, hits, max_hit]
+        self.ended_by = None  # 'idle', 'death' or 'mez' once closed
+
+    def add(self, now, spell_name, damage):
+        self.end = max(self.end, now)
+        self.total += damage
+        self.hits += 1
+        if damage > self.max_hit:
+            self.max_hit = damage
+        spell = self.spells.get(spell_name)
+        if spell is None:
+            spell = self.spells[spell_name] = [0, 0, 0]
+        spell[0] += damage
+        spell[1] += 1
+        if damage > spell[2]:
+            spell[2] = damage
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def dps(self):
+        # Counting at least one second, so a single hit is not a huge rate
+        return self.total / max(1.0, self.duration)
+
+    def summary(self):
+        return {
+            'monster_name': self.monster_name,
+            'start': self.start,
+            'duration': self.duration,
+            'total': self.total,
+            'hits': self.hits,
+            'max_hit': self.max_hit,
+            'dps': self.dps(),
+            'ended_by': self.ended_by,
+        }
+
+
+class EncounterTracker:
+    # Splits the event stream into fights per monster. A fight opens on the
+    # first hit and closes when the monster dies, is mezzed, or goes
+    # ENCOUNTER_IDLE_GAP seconds without a hit. Memory is bounded by the
+    # number of monsters in combat plus the two history limits.
+    def __init__(self, idle_gap=ENCOUNTER_IDLE_GAP, detailed=DETAILED_ENCOUNTERS, summaries=SUMMARY_ENCOUNTERS):
+        self.idle_gap = idle_gap
+        self.active = {}  # monster_name -> open Encounter
+        self.closed = deque()
+        self.detailed = detailed
+        self.summaries = deque(maxlen=summaries)
+        self.closed_count = 0
+
+    def record(self, event, now):
+        # Returns the encounter the event closed, if it closed one
+        monster_name = event.get('monster_name')
+        if event['type'] == 'damage':
+            self.hit(monster_name, event['spell_name'], event['damage'], now)
+        elif event['type'] == 'death':
+            return self.close_monster(monster_name, 'death')
+        elif event['type'] == 'special' and event.get('category') == 'crowd_control':
+            return self.close_monster(monster_name, 'mez')
+        return None
+
+    def hit(self, monster_name, spell_name, damage, now):
+        encounter = self.active.get(monster_name)
+        if encounter is not None and now - encounter.end > self.idle_gap:
+            self.close(encounter, 'idle')
+            encounter = None
+        if encounter is None:
+            encounter = self.active[monster_name] = Encounter(monster_name, now)
+        encounter.add(now, spell_name, damage)
+
+    def record_events(self, events, now):
+        closed = []
+        for event in events:
+            encounter = self.record(event, now)
+            if encounter is not None:
+                closed.append(encounter)
+        return closed
+
+    def close_monster(self, monster_name, reason):
+        encounter = self.active.get(monster_name)
+        if encounter is not None:
+            self.close(encounter, reason)
+        return encounter
+
+    def close_idle(self, now):
+        for encounter in [e for e in self.active.values() if now - e.end > self.idle_gap]:
+            self.close(encounter, 'idle')
+
+    def close_all(self, reason='end'):
+        for encounter in list(self.active.values()):
+            self.close(encounter, reason)
+
+    def close(self, encounter, reason):
+        del self.active[encounter.monster_name]
+        encounter.ended_by = reason
+        self.closed.append(encounter)
+        self.closed_count += 1
+        while len(self.closed) > self.detailed:
+            self.summaries.append(self.closed.popleft().summary())
+
+    def history(self):
+        # Summaries of every encounter still remembered, oldest first
+        return list(self.summaries) + [encounter.summary() for encounter in self.closed]
@@ -0,0 +1,139 @@
+# event_history.py
+
+import queue
+import sqlite3
+import threading
+import time
+from metrics import metrics
+
+# Rows written per transaction at most, and how long the writer waits for a
+# batch to fill before committing what it has
+HISTORY_BATCH_SIZE = 2000
+HISTORY_FLUSH_INTERVAL = 1.0
+
+# Rows waiting for the writer; past this, new rows are dropped and counted
+# rather than letting the overlay wait on the disk
+HISTORY_QUEUE_LIMIT = 200000
+
+SCHEMA = [
+    '''CREATE TABLE IF NOT EXISTS events (
+        id INTEGER PRIMARY KEY,
+        time REAL NOT NULL,
+        type TEXT NOT NULL,
+        spell TEXT,
+        monster TEXT,
+        category TEXT,
+        damage INTEGER
+    )''',
+    'CREATE INDEX IF NOT EXISTS events_time ON events (time)',
+    'CREATE INDEX IF NOT EXISTS events_monster ON events (monster, time)',
+    'CREATE INDEX IF NOT EXISTS events_spell ON events (spell, time)',
+]
+
+
+def connect(path):
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.commit()
+    return connection
+
+
+class EventHistory:
+    # Keeps every event in a SQLite database (WAL mode) for later analysis.
+    # write() only queues the rows; a writer thread commits them in batches,
+    # so the overlay never waits on the disk.
+    def __init__(self, path):
+        self.path = path
+        self.rows = queue.Queue(HISTORY_QUEUE_LIMIT)
+        self.connection = connect(path)
+        self.writer = threading.Thread(target=self.run, name='event-history', daemon=True)
+        self.writer.start()
+
+    def write(self, events, now=None):
+        now = time.time() if now is None else now
+        for event in events:
+            try:
+                self.rows.put_nowait((
+                    now,
+                    event['type'],
+                    event.get('spell_name'),
+                    event.get('monster_name'),
+                    event.get('category'),
+                    event.get('damage')
+                ))
+            except queue.Full:
+                metrics.count('history_dropped')
+
+    def run(self):
+        running = True
+        while running:
+            batch = []
+            row = self.rows.get()
+            deadline = time.monotonic() + HISTORY_FLUSH_INTERVAL
+            while row is not None:
+                batch.append(row)
+                if len(batch) >= HISTORY_BATCH_SIZE:
+                    break
+                try:
+                    row = self.rows.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if row is None:
+                running = False
+            if batch:
+                try:
+                    with self.connection:
+                        self.connection.executemany(
+                            'INSERT INTO events (time, type, spell, monster, category, damage) VALUES (?, ?, ?, ?, ?, ?)',
+                            batch
+                        )
+                    metrics.count('history_written', len(batch))
+                except sqlite3.Error as e:
+                    print(f"Failed to write event history: {e}")
+        self.connection.close()
+
+    def close(self):
+        # Commits whatever is queued, then stops the writer
+        if self.writer.is_alive():
+            self.rows.put(None)
+            self.writer.join()
+
+
+class HistoryQuery:
+    # Read side of the history database; opens its own connection, so it can
+    # be used while the overlay is writing
+    def __init__(self, path):
+        self.connection = connect(path)
+
+    def damage_by_spell(self, since=0.0):
+        return self.connection.execute(
+            'SELECT spell, SUM(damage), COUNT(*), MAX(damage) FROM events '
+            "WHERE type = 'damage' AND time >= ? GROUP BY spell ORDER BY SUM(damage) DESC",
+            (since,)
+        ).fetchall()
+
+    def damage_by_monster(self, since=0.0):
+        return self.connection.execute(
+            'SELECT monster, SUM(damage), COUNT(*), MAX(damage) FROM events '
+            "WHERE type = 'damage' AND time >= ? GROUP BY monster ORDER BY SUM(damage) DESC",
+            (since,)
+        ).fetchall()
+
+    def damage_by_hour(self, since=0.0):
+        return self.connection.execute(
+            "SELECT CAST(time / 3600 AS INTEGER) * 3600, SUM(damage), COUNT(*) FROM events "
+            "WHERE type = 'damage' AND time >= ? GROUP BY 1 ORDER BY 1",
+            (since,)
+        ).fetchall()
+
+    def monster_hits(self, monster, since=0.0):
+        return self.connection.execute(
+            'SELECT time, spell, damage FROM events WHERE monster = ? AND time >= ? ORDER BY time',
+            (monster, since)
+        ).fetchall()
+
+    def close(self):
+        self.connection.close()
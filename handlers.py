@@ -4,64 +4,186 @@ import sys
 from watchdog.events import FileSystemEventHandler
 from typing import List, Dict, Any
 from config import Config
+from metrics import latency, metrics
+from config_snapshot import required_literal
+from encounters import match_death, DEATH_LITERAL
+
+
+def compile_spell_patterns(spells, matchers=None, compiled=None):
+    # Spell patterns ready for parse_line. matchers maps a pattern to its
+    # ConfigSnapshot row, whose known errors and prefilter literal are used
+    # as they are; compiled caches regexes across calls and is updated.
+    # Patterns the snapshot has checked are compiled by spell_regex on the
+    # first line that passes their prefilter, so most never are.
+    matchers = matchers or {}
+    compiled = {} if compiled is None else compiled
+    patterns = []
+    for spell in spells:
+        matcher = matchers.get(spell['regex_pattern'])
+        if matcher and matcher['error']:
+            print(f"Invalid regex pattern for spell '{spell['spell_name']}': {matcher['error']}")
+            continue
+        compiled_regex = compiled.get(spell['regex_pattern'])
+        if compiled_regex is None and not matcher:
+            try:
+                compiled_regex = re.compile(spell['regex_pattern'], re.IGNORECASE)
+            except re.error as e:
+                print(f"Invalid regex pattern for spell '{spell['spell_name']}': {e}")
+                continue
+            compiled[spell['regex_pattern']] = compiled_regex
+        patterns.append({
+            'spell_name': spell['spell_name'],
+            'regex_pattern': spell['regex_pattern'],
+            'regex': compiled_regex,  # None until spell_regex compiles it
+            # Text every match must contain; lines without it skip the regex
+            'literal': matcher['literal'] if matcher else required_literal(spell['regex_pattern']),
+            'message_template': spell.get('message_template', None),
+            'category': spell.get('category', 'damage')
+        })
+    return patterns
+
+
+def spell_regex(pattern):
+    # The pattern's compiled regex, compiling it on first use
+    regex = pattern['regex']
+    if regex is None:
+        regex = pattern['regex'] = re.compile(pattern['regex_pattern'], re.IGNORECASE)
+    return regex
+
+
+def parse_line(line, spell_patterns, spell_table, events, trace=None, counts=None):
+    # Appends the events one log line holds to events: every spell pattern
+    # that matches it, else the spell table's match, else a death. Returns
+    # how many were added. counts['prefiltered'], if given, goes up by one
+    # when the line failed the literal check of every pattern.
+    # Patterns see the whole line, timestamp included, so they may anchor on it
+    line = line.strip()
+    lowered = line.lower()
+    events_before = len(events)
+    searched = False
+    for pattern in spell_patterns:
+        if pattern['literal'] and pattern['literal'] not in lowered:
+            continue
+        searched = True
+        match = (pattern['regex'] or spell_regex(pattern)).search(line)
+        if match:
+            if pattern['message_template']:
+                # Special event; a pattern for a spell on yourself captures no name
+                monster_name = match.group(1) if match.re.groups else ''
+                message = pattern['message_template'].format(monster_name=monster_name)
+                events.append({
+                    'type': 'special',
+                    'spell_name': pattern['spell_name'],
+                    'message': message,
+                    'category': pattern['category'],
+                    'monster_name': monster_name,
+                    'trace': trace
+                })
+            else:
+                # Damage event
+                monster_name = match.group(1)
+                damage = int(match.group(2))
+                spell_name = pattern['spell_name']
+                category = pattern['category']
+                events.append({
+                    'type': 'damage',
+                    'spell_name': spell_name,
+                    'damage': damage,
+                    'category': category,
+                    'monster_name': monster_name,
+                    'trace': trace
+                })
+    if counts is not None and not searched:
+        counts['prefiltered'] += 1
+    if len(events) == events_before and spell_table is not None:
+        event = spell_table.match(line)
+        if event is not None:
+            event['trace'] = trace
+            events.append(event)
+    if len(events) == events_before and DEATH_LITERAL in lowered:
+        # Deaths close the monster's encounter
+        event = match_death(line)
+        if event is not None:
+            event['trace'] = trace
+            events.append(event)
+    return len(events) - events_before
 
 
 class LogHandler(FileSystemEventHandler):
-    def __init__(self, callback, config: Config):
+    def __init__(self, callback, config: Config, snapshot=None, spell_table=None):
         super().__init__()
         self.callback = callback
         self.config = config
+        self.snapshot = snapshot  # ConfigSnapshot with checked patterns and their prefilter literals
+        self.spell_table = spell_table  # SpellTable matching imported spells for lines no pattern took
         try:
             self._file = open(self.config.log_file_path, 'r', encoding='utf-8')
         except FileNotFoundError:
             print(f"Log file '{self.config.log_file_path}' not found.")
             sys.exit(1)
         self._file.seek(0, os.SEEK_END)
-        self.spell_patterns = []
-        for spell in self.config.spells:
-            try:
-                compiled_regex = re.compile(spell['regex_pattern'], re.IGNORECASE)
-                self.spell_patterns.append({
-                    'spell_name': spell['spell_name'],
-                    'regex': compiled_regex,
-                    'message_template': spell.get('message_template', None),
-                    'category': spell.get('category', 'damage')
-                })
-            except re.error as e:
-                print(f"Invalid regex pattern for spell '{spell['spell_name']}': {e}")
+        self.log_file_path = os.path.abspath(self.config.log_file_path)  # The file being tailed, even if the config moves on
+        self._compiled = {}  # regex_pattern -> compiled regex, reused across reloads
+        self.spell_patterns = self.compile_patterns(self.config.spells)
+
+    def compile_patterns(self, spells):
+        return compile_spell_patterns(spells, self.snapshot.matchers if self.snapshot else {}, self._compiled)
+
+    def reload(self, snapshot=None):
+        # Pick up the live config's spells, compiling only patterns that are
+        # new. The list is swapped in whole, so a read already in progress on
+        # the observer thread finishes against the old one. The log file is
+        # left open where it is, so no lines are skipped or read twice.
+        if snapshot is not None:
+            self.snapshot = snapshot
+        # Regexes compiled since the last reload are reused too
+        for pattern in self.spell_patterns:
+            if pattern['regex'] is not None:
+                self._compiled[pattern['regex_pattern']] = pattern['regex']
+        reused = sum(1 for spell in self.config.spells if spell['regex_pattern'] in self._compiled)
+        patterns = self.compile_patterns(self.config.spells)
+        self._compiled = {pattern['regex_pattern']: pattern['regex'] for pattern in patterns if pattern['regex'] is not None}
+        self.spell_patterns = patterns
+        print(f"Spell patterns reloaded: {reused} reused, {len(patterns) - reused} new")
 
     def on_modified(self, event):
-        if os.path.abspath(event.src_path) == os.path.abspath(self.config.log_file_path):
+        if os.path.abspath(event.src_path) == self.log_file_path:
+            trace = latency.start()
             lines = self._file.readlines()
+            latency.mark(trace, 'read')
             events = []
+            unmatched_lines = 0
+            counts = {'prefiltered': 0}
+            spell_patterns = self.spell_patterns
+            spell_table = self.spell_table
             for line in lines:
-                line = line.strip()
-                for pattern in self.spell_patterns:
-                    match = pattern['regex'].search(line)
-                    if match:
-                        if pattern['message_template']:
-                            # Special event
-                            monster_name = match.group(1)
-                            message = pattern['message_template'].format(monster_name=monster_name)
-                            events.append({
-                                'type': 'special',
-                                'spell_name': pattern['spell_name'],
-                                'message': message,
-                                'category': pattern['category'],
-                                'monster_name': monster_name
-                            })
-                        else:
-                            # Damage event
-                            monster_name = match.group(1)
-                            damage = int(match.group(2))
-                            spell_name = pattern['spell_name']
-                            category = pattern['category']
-                            events.append({
-                                'type': 'damage',
-                                'spell_name': spell_name,
-                                'damage': damage,
-                                'category': category,
-                                'monster_name': monster_name
-                            })
+                if not parse_line(line, spell_patterns, spell_table, events, trace, counts):
+                    unmatched_lines += 1
+            metrics.count('lines_read', len(lines))
+            metrics.count('lines_unmatched', unmatched_lines)
+            metrics.count('lines_prefiltered', counts['prefiltered'])
+            metrics.count('events_parsed', len(events))
             if events:
+                latency.mark(trace, 'parsed')
+                metrics.count('batches_emitted')
                 self.callback(events)
+
+
+class ConfigFileHandler(FileSystemEventHandler):
+    # Calls back whenever config.json is written. Editors that save by
+    # renaming a temporary file over it show up as a move.
+    def __init__(self, callback, config: Config):
+        super().__init__()
+        self.callback = callback
+        self.config_file = os.path.abspath(config.config_file)
+
+    def on_modified(self, event):
+        if os.path.abspath(event.src_path) == self.config_file:
+            self.callback()
+
+    def on_created(self, event):
+        self.on_modified(event)
+
+    def on_moved(self, event):
+        if os.path.abspath(event.dest_path) == self.config_file:
+            self.callback()
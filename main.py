@@ -1,82 +1,233 @@
 # main.py
 
+import time
+STARTED = time.perf_counter()
+
 import sys
 import os
 import signal
+import copy
+import argparse
+import threading
+from PyQt5.QtCore import QTimer, pyqtSignal
 from PyQt5.QtWidgets import QApplication, QMessageBox, QDialog
-from watchdog.observers import Observer
 from config import Config
-from handlers import LogHandler
+from config_snapshot import ConfigSnapshot
+from spell_db import SpellTable
+from metrics import latency, startup
 from utils import load_custom_fonts, show_error_message, signal_handler
 from ui.configuration_window import ConfigurationWindow
 from ui.overlay_window import OverlayWindow
 
+startup.started = STARTED
+startup.record('imports', STARTED)
+
+
+# Settings written in quick succession (editors often save in several steps)
+# are applied once after this long
+CONFIG_RELOAD_DELAY_MS = 250
+
 
 class DamageOverlayApp(QApplication):
-    def __init__(self, sys_argv, config: Config):
-        super().__init__(sys_argv)
-        self.config = config
-        load_custom_fonts(self.config)
-        self.overlay = OverlayWindow(self.config)
-        self.overlay.show()
+    config_file_changed = pyqtSignal()
+    snapshot_ready = pyqtSignal(object)
 
-        self.log_handler = LogHandler(self.process_log_lines, self.config)
-        self.observer = Observer()
-        log_dir = os.path.dirname(os.path.abspath(self.config.log_file_path))
-        self.observer.schedule(self.log_handler, log_dir, recursive=False)
-        self.observer.start()
+    def __init__(self, sys_argv, config: Config, snapshot=None, validate_in_background=False):
+        with startup.phase('qt init'):
+            super().__init__(sys_argv)
+        self.config = config
+        if snapshot is None:
+            with startup.phase('validation'):
+                snapshot = ConfigSnapshot.cached(self.config)
+                if snapshot is None and not validate_in_background:
+                    snapshot = ConfigSnapshot.load(self.config)
+        if snapshot is None:
+            # Start on the raw config and check it on a worker thread; the
+            # handler picks up the checked patterns when they arrive
+            self.snapshot_ready.connect(self.apply_snapshot)
+            snapshot_config = copy.deepcopy(self.config)
+            threading.Thread(
+                target=lambda: self.snapshot_ready.emit(ConfigSnapshot.load(snapshot_config)),
+                daemon=True
+            ).start()
+        elif validate_in_background:
+            self.report_missing_icons(snapshot)
+        self.snapshot = snapshot
+        with startup.phase('fonts'):
+            load_custom_fonts(self.config)
+        with startup.phase('spells'):
+            self.spell_table = SpellTable.load(self.config)
+        with startup.phase('ui'):
+            self.overlay = OverlayWindow(self.config, self.spell_table)
+            if not self.overlay.compact:
+                self.overlay.show()
+            else:
+                # Nothing is drawn until the first hit; count the overlay as up
+                # once the event loop is running
+                QTimer.singleShot(0, startup.frame_shown)
+
+        with startup.phase('observer'):
+            # watchdog is only needed once the overlay is running, so it is
+            # not loaded while the configuration dialog is up
+            from watchdog.observers import Observer
+            from handlers import LogHandler, ConfigFileHandler
+
+            self.log_handler = LogHandler(self.process_log_lines, self.config, self.snapshot, self.spell_table)
+            self.observer = Observer()
+            log_dir = os.path.dirname(os.path.abspath(self.config.log_file_path))
+            self.observer.schedule(self.log_handler, log_dir, recursive=False)
+
+            # Watch config.json and apply edits while running. The watchdog
+            # callback only pokes the GUI thread, where the reload happens.
+            self.reload_timer = QTimer()
+            self.reload_timer.setSingleShot(True)
+            self.reload_timer.timeout.connect(self.reload_config)
+            self.config_file_changed.connect(lambda: self.reload_timer.start(CONFIG_RELOAD_DELAY_MS))
+            self.config_handler = ConfigFileHandler(self.config_file_changed.emit, self.config)
+            self.observer.schedule(self.config_handler, os.path.dirname(self.config.config_file), recursive=False)
+            self.observer.start()
+
+        self.aboutToQuit.connect(self.overlay.close_history)
+        self.aboutToQuit.connect(self.overlay.close_column_store)
+        self.aboutToQuit.connect(self.overlay.save_damage_stats)
+        if self.config.latency_report_path:
+            self.aboutToQuit.connect(lambda: latency.export(self.config.latency_report_path))
 
     def process_log_lines(self, damage_events):
         if not damage_events:
             return
         self.overlay.damage_received.emit(damage_events)
 
+    def apply_snapshot(self, snapshot):
+        if not snapshot.is_current(self.config):
+            return  # The config was reloaded meanwhile, which checked it again
+        self.snapshot = snapshot
+        self.report_missing_icons(snapshot)
+        self.log_handler.reload(snapshot)
+
+    def report_missing_icons(self, snapshot):
+        # Spells without an icon are skipped on screen rather than stopping the overlay
+        for spell in snapshot.missing_icons():
+            print(f"Missing icon for '{spell['spell_name']}': {spell['icon_path']}")
+
+    def reload_config(self):
+        new_config = Config()
+        if not new_config.load_from_file():
+            print("Keeping the current settings.")
+            return
+        changed = self.config.diff(new_config)
+        if not changed:
+            return
+
+        if 'font_file' in changed and not os.path.exists(os.path.join(self.config.script_dir, new_config.font_file)):
+            print(f"Font file '{new_config.font_file}' not found; keeping the current font.")
+            changed.discard('font_file')
+        if 'log_file_path' in changed:
+            print("Log file changes take effect after a restart.")
+
+        previous = copy.deepcopy(self.config)
+        self.config.update_from(new_config, changed)
+        if 'font_file' in changed:
+            load_custom_fonts(self.config)
+            if self.config.font_family != previous.font_family:
+                changed.add('font_family')
+        if 'spells' in changed:
+            self.snapshot = ConfigSnapshot.load(self.config)
+            self.log_handler.reload(self.snapshot)
+        spell_table = None
+        if changed & {'spells', 'spell_database_path', 'spell_icon_dir'}:
+            spell_table = self.spell_table = SpellTable.load(self.config)
+            self.log_handler.spell_table = spell_table
+        self.overlay.apply_config_changes(changed, previous, spell_table)
+        print(f"Configuration reloaded: {', '.join(sorted(changed))}")
+
     def __del__(self):
         self.observer.stop()
         self.observer.join()
 
 
+def check_fonts(config: Config):
+    font_dir = os.path.dirname(config.font_file)
+    if not os.path.isdir(font_dir):
+        msg = "The directory for fonts does not exist. Please ensure the font file path is correct."
+        show_error_message("Missing Fonts Directory", msg)
+        sys.exit(1)
+    font_file_path = config.font_file
+    if not os.path.exists(font_file_path):
+        msg = f"The font file '{font_file_path}' is missing."
+        show_error_message("Missing Font File", msg)
+        sys.exit(1)
+
+
+def run_overlay(qt_argv, config: Config, snapshot=None, validate_in_background=False):
+    main_app = DamageOverlayApp(qt_argv, config, snapshot, validate_in_background)
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    if hasattr(signal, 'SIGUSR1'):
+        # kill -USR1 <pid> shows or hides the performance HUD
+        signal.signal(signal.SIGUSR1, lambda sig, frame: main_app.overlay.toggle_hud())
+
+    try:
+        sys.exit(main_app.exec_())
+    except SystemExit:
+        print("Exiting...")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Damage overlay for the game log.')
+    parser.add_argument('--no-dialog', action='store_true',
+                        help='start straight from the saved config.json without showing the configuration dialog')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print where startup time went once the overlay is up')
+    # Anything else (e.g. -platform offscreen) is left for Qt
+    return parser.parse_known_args(argv)
+
+
 def main():
-    initial_config = Config()
-    initial_config.load_from_file()
+    args, qt_args = parse_args(sys.argv[1:])
+    qt_argv = sys.argv[:1] + qt_args
+    startup.enabled = args.profile_startup
+
+    with startup.phase('config'):
+        initial_config = Config()
+        loaded = initial_config.load_from_file()
+
+    if args.no_dialog:
+        if loaded:
+            # The saved config was checked when it was saved. Missing icons
+            # are only skipped at runtime, so they are reported rather than
+            # fatal, and the checks come from the cache or run in the background.
+            check_fonts(initial_config)
+            run_overlay(qt_argv, initial_config, validate_in_background=True)
+            return
+        print("No saved configuration to start from; showing the configuration dialog.")
 
-    app = QApplication(sys.argv)
+    app = QApplication(qt_argv)
 
     config_window = ConfigurationWindow(initial_config)
     config_window.setModal(True)
     config_window.config_saved.connect(lambda cfg: cfg.save_to_file())
 
-    if config_window.exec_() == QDialog.Accepted:
+    with startup.phase('config dialog'):
+        accepted = config_window.exec_() == QDialog.Accepted
+
+    if accepted:
         updated_config = config_window.config
         updated_config.save_to_file()
 
-        missing_icons = [spell['spell_name'] for spell in updated_config.spells if not os.path.exists(spell['icon_path'])]
+        # Checked patterns and icons come from config_cache.json while nothing has changed
+        with startup.phase('validation'):
+            snapshot = ConfigSnapshot.load(updated_config)
+        missing_icons = snapshot.missing_icons()
         if missing_icons:
             msg = "The following icon files are missing:\n" + "\n".join(
-                f" - {spell['spell_name']}: {spell['icon_path']}" for spell in updated_config.spells if not os.path.exists(spell['icon_path'])
+                f" - {spell['spell_name']}: {spell['icon_path']}" for spell in missing_icons
             )
             show_error_message("Missing Icons", msg)
             sys.exit(1)
 
-        font_dir = os.path.dirname(updated_config.font_file)
-        if not os.path.isdir(font_dir):
-            msg = "The directory for fonts does not exist. Please ensure the font file path is correct."
-            show_error_message("Missing Fonts Directory", msg)
-            sys.exit(1)
-        font_file_path = updated_config.font_file
-        if not os.path.exists(font_file_path):
-            msg = f"The font file '{font_file_path}' is missing."
-            show_error_message("Missing Font File", msg)
-            sys.exit(1)
-
-        main_app = DamageOverlayApp(sys.argv, updated_config)
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
-
-        try:
-            sys.exit(main_app.exec_())
-        except SystemExit:
-            print("Exiting...")
+        check_fonts(updated_config)
+        run_overlay(qt_argv, updated_config, snapshot)
     else:
         print("Configuration canceled. Exiting.")
         sys.exit(0)
@@ -0,0 +1,258 @@
+# metrics.py
+
+import csv
+import json
+import math
+import time
+from contextlib import contextmanager
+
+
+class LogHistogram:
+    # Fixed log-scale buckets, each GROWTH times wider than the last, from
+    # MINIMUM up. Recording is O(1), memory stays constant however many
+    # samples come in, percentiles are read back to within one bucket, and
+    # two histograms with the same scale merge by adding their buckets.
+    GROWTH = 2 ** (1 / 8)
+    MINIMUM = 1.0
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def bucket_index(self, value):
+        if value <= self.MINIMUM:
+            return 0
+        return math.ceil(math.log(value / self.MINIMUM, self.GROWTH))
+
+    def record(self, value):
+        index = self.bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if not self.count or value < self.min:
+            self.min = value
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction):
+        # Upper edge of the bucket holding the sample at this rank
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return max(self.min, min(self.max, self.MINIMUM * self.GROWTH ** index))
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        if other.count and (not self.count or other.min < self.min):
+            self.min = other.min
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'buckets': {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        histogram.buckets = {int(index): count for index, count in data['buckets'].items()}
+        return histogram
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.mean(),
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'max': self.max,
+        }
+
+
+class LatencyHistogram(LogHistogram):
+    # Milliseconds, in buckets about 9% wide from 1 µs up
+    MINIMUM = 0.001
+
+
+class LatencyRecorder:
+    # Follows each batch of log lines from the filesystem event to the first
+    # paint of a widget showing it. LogHandler starts a trace and the stages
+    # stamp it as the batch passes through; the timestamps all come from
+    # time.perf_counter so they compare across threads.
+    STAGES = (
+        ('read', 'fs_event', 'read'),          # file event -> lines read
+        ('parse', 'read', 'parsed'),           # lines read -> events matched
+        ('emit', 'parsed', 'received'),        # handed to the GUI thread -> show_damage starts
+        ('show_damage', 'received', 'shown'),  # groups laid out and widgets built
+        ('paint', 'shown', 'painted'),         # -> first widget of the batch painted
+        ('total', 'fs_event', 'painted'),
+    )
+
+    def __init__(self):
+        self.histograms = {stage: LatencyHistogram() for stage, _, _ in self.STAGES}
+        self.started = time.monotonic()
+
+    def start(self):
+        return {'fs_event': time.perf_counter()}
+
+    def mark(self, trace, name):
+        if trace is not None and name not in trace:
+            trace[name] = time.perf_counter()
+
+    def shown(self, trace):
+        # Everything up to show_damage is known once it returns
+        if trace is None:
+            return
+        self.mark(trace, 'shown')
+        self.record_stages(trace, painted=False)
+        if 'painted' in trace:
+            self.record_stages(trace, painted=True)
+
+    def painted(self, trace):
+        # Several widgets share a batch's trace; the first one to paint counts.
+        # A window shown synchronously can paint before show_damage returns,
+        # in which case shown() records the paint stages.
+        if trace is None or 'painted' in trace:
+            return
+        self.mark(trace, 'painted')
+        if 'shown' in trace:
+            self.record_stages(trace, painted=True)
+
+    def record_stages(self, trace, painted):
+        for stage, start, end in self.STAGES:
+            if (end == 'painted') == painted and start in trace and end in trace:
+                self.histograms[stage].record(max(0.0, trace[end] - trace[start]) * 1000)
+
+    def snapshot(self):
+        return {stage: self.histograms[stage].summary() for stage, _, _ in self.STAGES}
+
+    def reset(self):
+        self.__init__()
+
+    def export(self, path):
+        # JSON by default, CSV when the path ends in .csv
+        snapshot = self.snapshot()
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(['stage', 'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+                for stage, stats in snapshot.items():
+                    writer.writerow([stage, stats['count']] + [
+                        f"{stats[key]:.3f}" for key in ('mean', 'p50', 'p95', 'p99', 'max')
+                    ])
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'seconds': round(time.monotonic() - self.started, 1),
+                    'stages': snapshot,
+                }, f, indent=4)
+        print(f"Latency report written to {path}")
+
+    def format_lines(self):
+        lines = []
+        for stage, stats in self.snapshot().items():
+            lines.append(f"{stage:<11} n={stats['count']:<5} p50={stats['p50']:6.1f}"
+                         f" p95={stats['p95']:6.1f} p99={stats['p99']:6.1f} ms")
+        return lines
+
+
+class MetricsRegistry:
+    # Central place for the parser and the renderer to report what they are
+    # doing. Counters only ever go up and each one is written from a single
+    # thread; gauges are callables that are only evaluated when somebody
+    # reads them, so registering one costs nothing on the hot path.
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self._rate_base = {}
+        self._rate_time = time.monotonic()
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def counter(self, name):
+        return self.counters.get(name, 0)
+
+    def gauge(self, name, read):
+        self.gauges[name] = read
+
+    def read(self, name):
+        read = self.gauges.get(name)
+        return read() if read is not None else None
+
+    def rates(self):
+        # Per-second rate of every counter since the previous call
+        now = time.monotonic()
+        elapsed = now - self._rate_time
+        counters = dict(self.counters)
+        rates = {
+            name: (value - self._rate_base.get(name, 0)) / elapsed if elapsed > 0 else 0.0
+            for name, value in counters.items()
+        }
+        self._rate_base = counters
+        self._rate_time = now
+        return rates
+
+
+class StartupProfiler:
+    # Wall time spent in each startup phase, and the time from process start
+    # to the first overlay frame. Phases are recorded in the order they end.
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []  # [(name, seconds)]
+        self.first_frame = None
+        self.enabled = False  # Print the report once the first frame is up
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def record(self, name, started):
+        self.phases.append((name, time.perf_counter() - started))
+
+    def frame_shown(self):
+        if self.first_frame is not None:
+            return
+        self.first_frame = time.perf_counter() - self.started
+        if self.enabled:
+            print(self.report())
+
+    def report(self):
+        lines = ['Startup profile']
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<16} {seconds * 1000:8.1f} ms")
+        if self.first_frame is not None:
+            lines.append(f"  {'first frame at':<16} {self.first_frame * 1000:8.1f} ms")
+        return '\n'.join(lines)
+
+
+# Shared by the log handler and the overlay
+latency = LatencyRecorder()
+metrics = MetricsRegistry()
+startup = StartupProfiler()
@@ -0,0 +1,388 @@
+# report.py
+#
+# Per-fight, per-spell and per-monster damage breakdown of finished logs,
+# without the overlay. Lines go through the same matching LogHandler uses
+# (the config's spell patterns, the spell table and death lines), split into
+# chunks parsed in parallel:
+#
+#   python report.py eqlog_Char_pq.proj.txt
+#   python report.py raid1.txt raid2.txt --format csv --output raid.csv
+#   python report.py eqlog.txt --format json --sketches season.json
+#   python report.py eqlog.txt --check-literals
+
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import contextlib
+import multiprocessing
+from datetime import datetime
+from config import Config
+from spell_db import SpellTable, DAMAGE_RULE_LITERAL
+from handlers import compile_spell_patterns, parse_line, spell_regex
+from encounters import EncounterTracker, ENCOUNTER_IDLE_GAP, DEATH_LITERAL
+from damage_stats import DamageSketches, QUANTILES
+
+# Files are split into pieces of about this size, each parsed by one worker
+CHUNK_BYTES = 16 * 1024 * 1024
+
+# Month names in log timestamps like "[Mon Oct 19 07:30:00 2026] ..."
+MONTHS = {name: number for number, name in enumerate(
+    ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'), 1)}
+
+# Set up once per worker process by init_worker
+_spell_patterns = None
+_spell_table = None
+_candidates = None
+
+
+def load_config(path):
+    config = Config()
+    if path:
+        config.config_file = os.path.abspath(path)
+    if os.path.exists(config.config_file):
+        config.load_from_file()
+    return config
+
+
+def init_worker(config_path):
+    global _spell_patterns, _spell_table, _candidates
+    # Loading notes go to stderr, so stdout holds only the report
+    with contextlib.redirect_stdout(sys.stderr):
+        config = load_config(config_path)
+        _spell_patterns = compile_spell_patterns(config.spells)
+        _spell_table = SpellTable.load(config)
+    _candidates = candidate_literals(_spell_patterns, _spell_table)
+
+
+def candidate_literals(spell_patterns, spell_table):
+    # Lowercased text at least one of which is in every line parse_line could
+    # match, or None when some spell has no such text and every line has to
+    # be tried. A literal containing a shorter one adds nothing.
+    if spell_table is not None and spell_table.by_message:
+        return None
+    literals = {DEATH_LITERAL}
+    if spell_table is not None and len(spell_table):
+        literals.add(DAMAGE_RULE_LITERAL)
+    for pattern in spell_patterns:
+        if not pattern['literal']:
+            return None
+        literals.add(pattern['literal'])
+    return [literal for literal in literals if not any(other != literal and other in literal for other in literals)]
+
+
+def check_literals(paths, spell_patterns):
+    # Runs every spell pattern on every line, prefilter or not, and returns
+    # {spell_name: (literal, lines)} for patterns that matched lines without
+    # their required literal, which the prefilter would have skipped
+    misses = {}
+    for path in paths:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.strip()
+                lowered = line.lower()
+                for pattern in spell_patterns:
+                    literal = pattern['literal']
+                    if literal and literal not in lowered and spell_regex(pattern).search(line):
+                        lines = misses.get(pattern['spell_name'], (literal, 0))[1]
+                        misses[pattern['spell_name']] = (literal, lines + 1)
+    return misses
+
+
+def parse_timestamp(stamp):
+    # "Mon Oct 19 07:30:00 2026" as local epoch seconds, or None
+    try:
+        _, month, day, clock, year = stamp.split()
+        hour, minute, second = clock.split(':')
+        return datetime(int(year), MONTHS[month], int(day), int(hour), int(minute), int(second)).timestamp()
+    except (ValueError, KeyError):
+        return None
+
+
+def chunks(path, size=CHUNK_BYTES):
+    file_size = os.path.getsize(path)
+    return [(path, start, min(start + size, file_size)) for start in range(0, file_size, size)] or [(path, 0, 0)]
+
+
+def read_chunk(path, start, end):
+    # The lines starting in [start, end) of the file as one string; the line
+    # running over start belongs to the chunk before
+    with open(path, 'rb') as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()
+        first = f.tell()
+        data = f.read(end - first) if end > first else b''
+        if data and not data.endswith(b'\n'):
+            data += f.readline()
+    return data.decode('utf-8', 'replace')
+
+
+def candidate_lines(text, literals):
+    # The lines holding any of the literals, in order, found with str.find
+    # over the lowercased chunk so the other lines are never looked at
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        # Lowercasing changed some character's length; offsets would not line up
+        return text.splitlines()
+    starts = set()
+    for literal in literals:
+        i = lowered.find(literal)
+        while i >= 0:
+            starts.add(lowered.rfind('\n', 0, i) + 1)
+            i = lowered.find(literal, i + len(literal))
+    lines = []
+    for start in sorted(starts):
+        end = text.find('\n', start)
+        lines.append(text[start:end if end >= 0 else len(text)])
+    return lines
+
+
+def parse_chunk(task):
+    # Parses one chunk. Returns the damage distributions of its hits, the
+    # events the encounters are built from as (time, type, spell, monster,
+    # damage, category) tuples in log order, and the number of lines read.
+    path, start, end = task
+    text = read_chunk(path, start, end)
+    line_count = text.count('\n') + (1 if text and not text.endswith('\n') else 0)
+    lines = candidate_lines(text, _candidates) if _candidates is not None else text.splitlines()
+
+    spell_patterns, spell_table = _spell_patterns, _spell_table
+    sketches = DamageSketches()
+    rows = []
+    events = []
+    last_stamp = None
+    last_time = 0.0
+    for line in lines:
+        if not parse_line(line, spell_patterns, spell_table, events):
+            continue
+        stamp = line[1:25] if line.startswith('[') else None
+        if stamp != last_stamp:
+            last_stamp = stamp
+            # A line without a readable timestamp keeps the time of the one before
+            last_time = (parse_timestamp(stamp) if stamp else None) or last_time
+        for event in events:
+            damage = event.get('damage')
+            if event['type'] == 'damage':
+                sketches.add(event['spell_name'], event['monster_name'], damage)
+            rows.append((last_time, event['type'], event.get('spell_name'), event['monster_name'], damage, event['category']))
+        events.clear()
+    return sketches, rows, line_count
+
+
+class Report:
+    # Merges the chunks' distributions, and folds their events, file by file
+    # and in log order, into encounters
+    def __init__(self, idle_gap=ENCOUNTER_IDLE_GAP):
+        self.idle_gap = idle_gap
+        self.fights = []
+        self.sketches = DamageSketches()
+        self.fight_seconds = {}  # monster_name -> seconds of its fights
+        self.combat_seconds = 0.0
+        self.lines = 0
+        self.events = 0
+
+    def add_file(self, path, parsed_chunks):
+        # Every fight of the file is kept, in summary
+        tracker = EncounterTracker(self.idle_gap, detailed=0, summaries=None)
+        hit, close_monster = tracker.hit, tracker.close_monster
+        for sketches, rows, line_count in parsed_chunks:
+            self.sketches.merge(sketches)
+            self.lines += line_count
+            self.events += len(rows)
+            for when, event_type, spell_name, monster_name, damage, category in rows:
+                if event_type == 'damage':
+                    hit(monster_name, spell_name, damage, when)
+                elif event_type == 'death':
+                    close_monster(monster_name, 'death')
+                elif category == 'crowd_control':
+                    close_monster(monster_name, 'mez')
+        tracker.close_all()
+
+        name = os.path.basename(path)
+        fights = tracker.history()
+        for fight in fights:
+            fight['file'] = name
+            # Counting at least a second, as the fight's DPS does
+            monster_name = fight['monster_name']
+            self.fight_seconds[monster_name] = self.fight_seconds.get(monster_name, 0.0) + max(1.0, fight['duration'])
+        self.combat_seconds += combat_time(fights)
+        self.fights.extend(fights)
+
+    def fight_rows(self):
+        return [{
+            'file': fight['file'],
+            'start': datetime.fromtimestamp(fight['start']).strftime('%Y-%m-%d %H:%M:%S'),
+            'monster': fight['monster_name'],
+            'duration': round(fight['duration'], 1),
+            'damage': fight['total'],
+            'dps': round(fight['dps'], 1),
+            'hits': fight['hits'],
+            'max_hit': fight['max_hit'],
+            'ended_by': fight['ended_by'],
+        } for fight in self.fights]
+
+    def table_rows(self, kind):
+        # kind is 'spell' or 'monster'. Spell DPS is over all time in combat,
+        # monster DPS over the monster's own fights.
+        sketches = self.sketches.spells if kind == 'spell' else self.sketches.monsters
+        rows = []
+        for name, sketch in sorted(sketches.items(), key=lambda item: item[1].total, reverse=True):
+            seconds = self.combat_seconds if kind == 'spell' else self.fight_seconds.get(name, 0.0)
+            row = {
+                kind: name,
+                'damage': int(sketch.total),
+                'dps': round(sketch.total / max(1.0, seconds), 1),
+                'hits': sketch.count,
+                'mean': round(sketch.mean(), 1),
+                'max_hit': int(sketch.max),
+            }
+            for fraction in QUANTILES:
+                row[f"p{fraction * 100:g}"] = round(sketch.percentile(fraction))
+            rows.append(row)
+        return rows
+
+    def tables(self):
+        return {
+            'fights': self.fight_rows(),
+            'spells': self.table_rows('spell'),
+            'monsters': self.table_rows('monster'),
+        }
+
+
+def combat_time(fights):
+    # Seconds covered by at least one fight
+    seconds = 0.0
+    current_start = current_end = None
+    for fight in sorted(fights, key=lambda fight: fight['start']):
+        start, end = fight['start'], fight['start'] + max(1.0, fight['duration'])
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                seconds += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        seconds += current_end - current_start
+    return seconds
+
+
+def format_text(tables):
+    lines = []
+    for title, rows in tables.items():
+        lines.append(f"{title.capitalize()} ({len(rows)})")
+        if rows:
+            columns = list(rows[0])
+            widths = {column: max(len(column), *(len(str(row[column])) for row in rows)) for column in columns}
+            widths = {column: min(width, 30) for column, width in widths.items()}
+            lines.append('  '.join(
+                f"{column:<{widths[column]}}" if isinstance(rows[0][column], str) else f"{column:>{widths[column]}}"
+                for column in columns
+            ))
+            for row in rows:
+                lines.append('  '.join(
+                    f"{str(row[column])[:widths[column]]:<{widths[column]}}" if isinstance(row[column], str)
+                    else f"{row[column]:>{widths[column]}}"
+                    for column in columns
+                ))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def write_csv(tables, output):
+    # One file per table next to output (raid.csv -> raid_fights.csv, ...),
+    # or all three on stdout one after another
+    stem, extension = os.path.splitext(output) if output else (None, '.csv')
+    for title, rows in tables.items():
+        if not rows:
+            continue
+        if stem:
+            with open(f"{stem}_{title}{extension}", 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+        else:
+            writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+            print()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Damage report for finished log files.')
+    parser.add_argument('logs', nargs='+', help='log files to read')
+    parser.add_argument('--config', default=None, help='config.json with the spells to match (default: the one next to this script)')
+    parser.add_argument('--format', choices=['text', 'csv', 'json'], default='text')
+    parser.add_argument('--output', default=None, help='write here instead of stdout')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='worker processes')
+    parser.add_argument('--idle-gap', type=float, default=ENCOUNTER_IDLE_GAP,
+                        help='seconds without a hit that end a fight')
+    parser.add_argument('--sketches', default=None,
+                        help='merge the damage distributions into this file for damage_stats.py')
+    parser.add_argument('--check-literals', action='store_true',
+                        help='only check that every line a spell pattern matches holds its prefilter literal')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    started = time.perf_counter()
+
+    tasks = []
+    for path in args.logs:
+        try:
+            tasks.append((path, chunks(path)))
+        except OSError as e:
+            print(f"Skipping '{path}': {e}", file=sys.stderr)
+
+    if args.check_literals:
+        with contextlib.redirect_stdout(sys.stderr):
+            spell_patterns = compile_spell_patterns(load_config(args.config).spells)
+        misses = check_literals([path for path, _ in tasks], spell_patterns)
+        for spell_name, (literal, lines) in misses.items():
+            print(f"'{spell_name}' matched {lines} lines without its literal {literal!r}")
+        print(f"Checked {len(spell_patterns)} patterns: {len(misses)} with lines their prefilter would skip")
+        sys.exit(1 if misses else 0)
+
+    report = Report(args.idle_gap)
+    all_chunks = [chunk for _, file_chunks in tasks for chunk in file_chunks]
+    if args.jobs > 1 and len(all_chunks) > 1:
+        with multiprocessing.Pool(min(args.jobs, len(all_chunks)), init_worker, (args.config,)) as pool:
+            # imap keeps the chunks in order, so each file is folded front to back
+            results = pool.imap(parse_chunk, all_chunks)
+            for path, file_chunks in tasks:
+                report.add_file(path, (next(results) for _ in file_chunks))
+    else:
+        init_worker(args.config)
+        for path, file_chunks in tasks:
+            report.add_file(path, (parse_chunk(chunk) for chunk in file_chunks))
+
+    tables = report.tables()
+    if args.format == 'csv':
+        write_csv(tables, args.output)
+    else:
+        text = json.dumps(tables, indent=4) if args.format == 'json' else format_text(tables)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text + '\n')
+        else:
+            print(text)
+
+    if args.sketches:
+        merged = DamageSketches()
+        try:
+            merged = DamageSketches.load(args.sketches)
+        except FileNotFoundError:
+            pass
+        merged.merge(report.sketches)
+        merged.save(args.sketches)
+
+    elapsed = time.perf_counter() - started
+    print(f"{report.lines} lines, {report.events} events, {len(report.fights)} fights"
+          f" in {elapsed:.2f} s ({report.lines / elapsed:,.0f} lines/s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# spell_db.py
+
+import os
+import re
+import csv
+import json
+from config import Config
+
+# The one rule every imported damage spell is matched by; the spell itself is
+# then found by name, so the cost per line does not grow with the table
+DAMAGE_RULE = re.compile(r'(.+?) has taken (\d+) damage from your (.+?)\.?$', re.IGNORECASE)
+DAMAGE_RULE_LITERAL = ' damage from your '
+
+# Log lines start with a timestamp like "[Mon Oct 19 07:30:00 2026] "
+TIMESTAMP_PREFIX = re.compile(r'^\[[^\]]*\]\s*')
+
+# Field positions in the game's '^'-separated spells_us.txt. The file says
+# nothing about how a spell should be shown, so its rows only lend their
+# landing text to spells the config or a CSV/JSON import gives a category.
+SPELLS_US_NAME = 1
+SPELLS_US_CAST_ON_OTHER = 7
+
+
+class SpellTable:
+    # Spells stored column-wise by id, indexed by lowercased name and by the
+    # text the game prints when the spell lands on someone else ("begins to
+    # scream."). Icons are kept as written in the database and only resolved
+    # to a file the first time a spell is shown. Spells without a category
+    # are never matched.
+    def __init__(self, icon_dir=''):
+        self.icon_dir = icon_dir
+        self.names = []
+        self.categories = []
+        self.icon_refs = []
+        self.messages = []  # Landing text, or None for spells matched by the damage rule
+        self.displays = []  # Template for the overlay text of a landing message
+        self.patterned = []  # True for config spells, which their own regex_pattern matches instead of the damage rule
+        self.by_name = {}
+        self.by_message = {}
+        self._icon_paths = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, category, icon=None, message=None, display=None, patterned=False):
+        # Adding a name that is already there replaces it, keeping its landing
+        # text unless new text is given
+        key = name.strip().lower()
+        spell_id = self.by_name.get(key)
+        if spell_id is None:
+            spell_id = len(self.names)
+            self.names.append(name)
+            self.categories.append(category)
+            self.icon_refs.append(icon)
+            self.messages.append(None)
+            self.displays.append(display)
+            self.patterned.append(patterned)
+            self.by_name[key] = spell_id
+        else:
+            self.categories[spell_id] = category
+            self.icon_refs[spell_id] = icon
+            self.displays[spell_id] = display
+            self.patterned[spell_id] = patterned
+            self._icon_paths.pop(spell_id, None)
+
+        message = (message or '').strip().lower()
+        if message:
+            if self.messages[spell_id]:
+                self.by_message.pop(self.messages[spell_id], None)
+            self.messages[spell_id] = message
+            self.by_message[message] = spell_id
+        return spell_id
+
+    @classmethod
+    def load(cls, config: Config):
+        # The spell database named in the config, if any, with the config's own
+        # spells layered on top
+        table = cls(os.path.join(config.script_dir, config.spell_icon_dir))
+        if config.spell_database_path:
+            path = os.path.join(config.script_dir, config.spell_database_path)
+            try:
+                count = table.import_file(path)
+                print(f"Imported {count} spells from {path}")
+            except (OSError, ValueError) as e:
+                print(f"Failed to import spell database '{path}': {e}")
+        for spell in config.spells:
+            table.add(
+                spell['spell_name'],
+                spell.get('category', 'damage'),
+                spell.get('icon_path'),
+                display=spell.get('message_template'),
+                patterned=True
+            )
+        return table
+
+    def import_file(self, path):
+        # CSV or JSON rows with name, category, icon, message and display
+        # columns (name and category are required), or the game's spells_us.txt
+        before = len(self)
+        if path.lower().endswith('.json'):
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+            for row in rows:
+                self.add_row(row)
+        elif path.lower().endswith('.csv'):
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.DictReader(f):
+                    self.add_row(row)
+        else:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    fields = line.rstrip('\n').split('^')
+                    if len(fields) > SPELLS_US_CAST_ON_OTHER and fields[SPELLS_US_NAME]:
+                        self.add(fields[SPELLS_US_NAME], None, message=fields[SPELLS_US_CAST_ON_OTHER])
+        return len(self) - before
+
+    def add_row(self, row):
+        if not row.get('name'):
+            raise ValueError(f"spell without a name: {row}")
+        if not row.get('category'):
+            raise ValueError(f"spell without a category: {row}")
+        self.add(
+            row['name'],
+            row['category'],
+            row.get('icon') or None,
+            row.get('message') or None,
+            row.get('display') or None
+        )
+
+    def spell_id(self, name):
+        return self.by_name.get(name.lower())
+
+    def icon_path(self, name):
+        # Resolved and checked once per spell; None when there is no usable icon
+        spell_id = self.spell_id(name)
+        if spell_id is None:
+            return None
+        if spell_id not in self._icon_paths:
+            icon = self.icon_refs[spell_id]
+            if icon and not os.path.isabs(icon):
+                icon = os.path.join(self.icon_dir, icon)
+            if icon and not os.path.exists(icon):
+                # Reported once; the spell is then left off the overlay
+                print(f"Missing icon for '{self.names[spell_id]}': {icon}")
+                icon = None
+            self._icon_paths[spell_id] = icon
+        return self._icon_paths[spell_id]
+
+    def match(self, line):
+        # An event dict for a line about an imported spell, or None
+        line = TIMESTAMP_PREFIX.sub('', line)
+        lowered = line.lower()
+
+        if DAMAGE_RULE_LITERAL in lowered:
+            match = DAMAGE_RULE.match(line)
+            if match:
+                spell_id = self.spell_id(match.group(3))
+                if spell_id is not None and self.categories[spell_id] and not self.patterned[spell_id]:
+                    return {
+                        'type': 'damage',
+                        'spell_name': self.names[spell_id],
+                        'damage': int(match.group(2)),
+                        'category': self.categories[spell_id],
+                        'monster_name': match.group(1)
+                    }
+
+        # Landing text follows the target's name, either after a space or as
+        # a possessive ("a gnoll's skin ..."), so try each place it could start
+        if not self.by_message:
+            return None
+        for separator, skip in ((' ', 1), ("'", 0)):
+            i = lowered.find(separator, 1)
+            while i > 0:
+                spell_id = self.by_message.get(lowered[i + skip:])
+                if spell_id is not None and self.categories[spell_id]:
+                    monster_name = line[:i]
+                    display = self.displays[spell_id]
+                    return {
+                        'type': 'special',
+                        'spell_name': self.names[spell_id],
+                        'message': display.format(monster_name=monster_name) if display else line,
+                        'category': self.categories[spell_id],
+                        'monster_name': monster_name
+                    }
+                i = lowered.find(separator, i + 1)
+        return None
@@ -0,0 +1,71 @@
+from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtWidgets import QApplication, QWidget
+from config import Config
+from .indicators import FloatingIndicator
+
+# Surfaces widen in steps so a slightly longer number does not resize the window
+WIDTH_STEP = 64
+
+
+class CategorySurface(QWidget):
+    # A translucent window sized to one category's live groups. It hangs
+    # below the category's start position, holds the indicators as children
+    # and hides itself when the category has nothing on screen, so the
+    # compositor only blends what is actually being shown.
+    def __init__(self, category: str, config: Config):
+        super().__init__()
+        self.category = category
+        self.config = config
+        self.content_width = 0
+        self.content_height = 0
+
+        self.setWindowFlags(
+            Qt.WindowStaysOnTopHint |
+            Qt.FramelessWindowHint |
+            Qt.Tool |
+            Qt.WindowTransparentForInput
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+    def fit(self, width, height):
+        # Grow to hold content of the given width and stack height. Widening
+        # keeps the column centred, so existing indicators shift by half the growth.
+        width = -(-width // WIDTH_STEP) * WIDTH_STEP
+        if width > self.content_width:
+            dx = (width - self.content_width) // 2
+            for child in self.findChildren(FloatingIndicator, options=Qt.FindDirectChildrenOnly):
+                child.shift(dx, 0)
+            self.content_width = width
+        self.content_height = height
+        self.apply_geometry()
+        if not self.isVisible():
+            self.show()
+
+    def shrink(self, height):
+        # Follow the stack back up as groups expire, and go away once it is empty
+        self.content_height = height
+        if height <= 0:
+            self.content_width = 0
+            self.hide()
+        else:
+            self.apply_geometry()
+
+    def apply_geometry(self):
+        # Tall enough for the live groups and the float below them, but never
+        # past the bottom of the screen the start position is on
+        x, y = self.config.start_positions.get(self.category, (960, 100))
+        height = self.content_height + self.config.float_distance
+        screen = QApplication.screenAt(QPoint(x, y)) or QApplication.primaryScreen()
+        if screen is not None:
+            height = min(height, max(1, screen.availableGeometry().bottom() + 1 - y))
+        self.setGeometry(
+            x - self.content_width // 2,
+            y,
+            self.content_width,
+            height
+        )
+
+    def origin(self):
+        # Where a group's start position falls in this surface's coordinates
+        return self.content_width // 2, 0
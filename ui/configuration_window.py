@@ -13,9 +13,10 @@ from PyQt5.QtWidgets import (
     QDoubleSpinBox,
     QMessageBox,
     QGroupBox,
-    QFormLayout
+    QFormLayout,
+    QComboBox,
+    QCheckBox
 )
-from .position_selector import PositionSelectorWindow
 from config import Config
 
 
@@ -88,6 +89,35 @@ class ConfigurationWindow(QDialog):
         padding_layout.addWidget(self.padding_input)
         layout.addLayout(padding_layout)
 
+        # Overlay Mode
+        mode_layout = QHBoxLayout()
+        mode_label = QLabel("Overlay Mode:")
+        self.mode_input = QComboBox()
+        self.mode_input.addItems(['fullscreen', 'compact'])
+        self.mode_input.setCurrentText(self.config.overlay_mode)
+        mode_layout.addWidget(mode_label)
+        mode_layout.addWidget(self.mode_input)
+        layout.addLayout(mode_layout)
+
+        # DPS Readout
+        self.dps_readout_input = QCheckBox("Show live DPS readout")
+        self.dps_readout_input.setChecked(self.config.dps_readout)
+        layout.addWidget(self.dps_readout_input)
+
+        # Rollup Threshold
+        rollup_layout = QHBoxLayout()
+        rollup_label = QLabel("Rollup Threshold (hits/sec, 0 = off):")
+        self.rollup_input = QSpinBox()
+        self.rollup_input.setRange(0, 100)
+        self.rollup_input.setValue(self.config.rollup_threshold)
+        self.rollup_scope_input = QComboBox()
+        self.rollup_scope_input.addItems(['monster', 'spell'])
+        self.rollup_scope_input.setCurrentText(self.config.rollup_scope)
+        rollup_layout.addWidget(rollup_label)
+        rollup_layout.addWidget(self.rollup_input)
+        rollup_layout.addWidget(self.rollup_scope_input)
+        layout.addLayout(rollup_layout)
+
         # Total Font Ratio
         total_font_layout = QHBoxLayout()
         total_font_label = QLabel("Total Damage Font Ratio:")
@@ -187,6 +217,8 @@ class ConfigurationWindow(QDialog):
             self.log_input.setText(file_path)
 
     def set_position(self, category):
+        # Loaded on first use; most runs never open the selector
+        from .position_selector import PositionSelectorWindow
         self.selector = PositionSelectorWindow(category, self.config.start_positions)
         self.selector.position_selected.connect(self.update_position)
         self.selector.exec_()
@@ -201,6 +233,10 @@ class ConfigurationWindow(QDialog):
         self.config.animation_duration = self.anim_input.value()
         self.config.float_distance = self.float_input.value()
         self.config.padding = self.padding_input.value()
+        self.config.overlay_mode = self.mode_input.currentText()
+        self.config.dps_readout = self.dps_readout_input.isChecked()
+        self.config.rollup_threshold = self.rollup_input.value()
+        self.config.rollup_scope = self.rollup_scope_input.currentText()
         self.config.total_font_ratio = self.total_font_input.value()
         self.config.total_color = self.total_color_input.text()
         self.config.opacity = self.opacity_input.value()
@@ -0,0 +1,80 @@
+from PyQt5 import QtCore
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import QLabel, QWidget, QVBoxLayout
+from config import Config
+from metrics import latency, metrics
+
+# How often the HUD text is refreshed. Rates are averaged over this window,
+# and nothing is computed between refreshes.
+HUD_REFRESH_MS = 1000
+
+
+class DebugHud(QWidget):
+    # Small always-on-top panel in the corner of the screen with what the
+    # parser and renderer report to the metrics registry, and the
+    # log-write-to-screen latency of each stage
+    def __init__(self, config: Config):
+        super().__init__()
+        self.config = config
+
+        self.setWindowFlags(
+            Qt.WindowStaysOnTopHint |
+            Qt.FramelessWindowHint |
+            Qt.Tool |
+            Qt.WindowTransparentForInput
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.text_label = QLabel()
+        font = QFont('monospace', 9)
+        font.setStyleHint(QFont.TypeWriter)
+        self.text_label.setFont(font)
+        self.text_label.setStyleSheet("color: white; background-color: rgba(0, 0, 0, 160); padding: 6px;")
+        layout.addWidget(self.text_label)
+        self.setLayout(layout)
+
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def start(self):
+        self.refresh()
+        self.show()
+        self.refresh_timer.start(HUD_REFRESH_MS)
+
+    def stop(self):
+        self.refresh_timer.stop()
+        self.hide()
+
+    def lines(self):
+        rates = metrics.rates()
+        lines_read = rates.get('lines_read', 0.0)
+        # Shares of lines read: those that yielded no event, and those the
+        # literal prefilter kept away from every spell regex
+        unmatched = rates.get('lines_unmatched', 0.0) / lines_read * 100 if lines_read else 0.0
+        prefiltered = rates.get('lines_prefiltered', 0.0) / lines_read * 100 if lines_read else 0.0
+        rss = metrics.read('rss')
+        idle_cpu = metrics.read('idle_cpu')
+        lines = [
+            'Performance',
+            f"events/s    {rates.get('events_shown', 0.0):8.1f}   lines/s {lines_read:8.1f}",
+            f"no event    {unmatched:7.1f}%   queue   {metrics.read('queue_depth') or 0:8d}",
+            f"prefilter   {prefiltered:7.1f}%",
+            f"groups      {metrics.read('live_groups') or 0:8d}   widgets {metrics.read('live_widgets') or 0:8d}",
+            f"frame lag   {metrics.read('frame_ms') or 0.0:6.1f} ms   ({metrics.read('quality')})",
+            (f"rss         {rss / (1024 * 1024):6.1f} MB" if rss is not None else 'rss              n/a')
+            + (f"   idle cpu {idle_cpu:7.2f}%" if idle_cpu is not None else '   idle cpu      n/a'),
+            f"encounters  {metrics.read('encounters_active') or 0:8d}   closed  {metrics.read('encounters_closed') or 0:8d}",
+            '',
+            'Latency (log write -> screen)',
+        ]
+        return lines + latency.format_lines()
+
+    @QtCore.pyqtSlot()
+    def refresh(self):
+        self.text_label.setText('\n'.join(self.lines()))
+        self.adjustSize()
+        self.move(10, 10)
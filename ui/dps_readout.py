@@ -0,0 +1,78 @@
+import time
+from PyQt5 import QtCore
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QLabel, QWidget, QVBoxLayout
+from config import Config
+from dps import DpsEngine
+from damage_stats import DamageSketches
+
+# The readout is redrawn this often; queries are O(1) per meter, so this only
+# bounds how often the label is re-laid out
+READOUT_REFRESH_MS = 500
+
+# Monsters listed under the overall line, and spells with their hit percentiles
+READOUT_MONSTERS = 3
+READOUT_SPELLS = 3
+
+
+class DpsReadout(QWidget):
+    # A few lines of live DPS centred on Config.dps_readout_position: the
+    # player overall, then the monsters taking the most damage, then the
+    # session's hit percentiles of the spells doing the most
+    def __init__(self, config: Config, engine: DpsEngine, sketches: DamageSketches = None):
+        super().__init__()
+        self.config = config
+        self.engine = engine
+        self.sketches = sketches
+
+        self.setWindowFlags(
+            Qt.WindowStaysOnTopHint |
+            Qt.FramelessWindowHint |
+            Qt.Tool |
+            Qt.WindowTransparentForInput
+        )
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.text_label = QLabel()
+        self.text_label.setStyleSheet(
+            f"color: white; background-color: rgba(0, 0, 0, 120); padding: 4px; "
+            f"font-family: '{self.config.font_family}'; font-size: 10px;"
+        )
+        layout.addWidget(self.text_label)
+        self.setLayout(layout)
+
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def start(self):
+        self.refresh()
+        self.show()
+        self.refresh_timer.start(READOUT_REFRESH_MS)
+
+    def stop(self):
+        self.refresh_timer.stop()
+        self.hide()
+
+    def lines(self, now):
+        lines = [f"{'DPS':<18} {'5s':>6} {'30s':>6} {'fight':>6}"]
+        rows = [('You', self.engine.overall.rates(now))] + self.engine.top_monsters(now, READOUT_MONSTERS)
+        for name, (short, long, fight) in rows:
+            lines.append(f"{name[:18]:<18} {short:6.0f} {long:6.0f} {fight:6.0f}")
+        if self.sketches is not None:
+            spells = [(name, self.sketches.spell_quantiles(name)) for name, _ in self.engine.top_spells(now, READOUT_SPELLS)]
+            spells = [(name, quantiles) for name, quantiles in spells if quantiles]
+            if spells:
+                lines.append(f"{'Hit':<18} {'p50':>6} {'p90':>6} {'p99':>6}")
+                for name, (p50, p90, p99) in spells:
+                    lines.append(f"{name[:18]:<18} {p50:6.0f} {p90:6.0f} {p99:6.0f}")
+        return lines
+
+    @QtCore.pyqtSlot()
+    def refresh(self):
+        self.text_label.setText('\n'.join(self.lines(time.monotonic())))
+        self.adjustSize()
+        x, y = self.config.dps_readout_position
+        self.move(x - self.width() // 2, y)
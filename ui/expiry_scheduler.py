@@ -0,0 +1,46 @@
+import heapq
+import itertools
+
+
+class ExpiryScheduler:
+    # Deadline-ordered min-heap of items waiting to expire. Rescheduling an
+    # item just pushes a new entry; stale entries are skipped when they reach
+    # the top, so schedule, cancel and pop are all O(log n).
+    def __init__(self):
+        self._heap = []
+        self._deadlines = {}
+        self._counter = itertools.count()
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, item):
+        return item in self._deadlines
+
+    def schedule(self, item, deadline):
+        self._deadlines[item] = deadline
+        heapq.heappush(self._heap, (deadline, next(self._counter), item))
+
+    def cancel(self, item):
+        self._deadlines.pop(item, None)
+
+    def next_deadline(self):
+        self._discard_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_expired(self, now):
+        expired = []
+        while True:
+            self._discard_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return expired
+            _, _, item = heapq.heappop(self._heap)
+            del self._deadlines[item]
+            expired.append(item)
+
+    def _discard_stale(self):
+        while self._heap:
+            deadline, _, item = self._heap[0]
+            if self._deadlines.get(item) == deadline:
+                return
+            heapq.heappop(self._heap)
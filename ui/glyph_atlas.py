@@ -0,0 +1,120 @@
+import math
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QGuiApplication, QPainter, QPixmap
+from PyQt5.QtWidgets import QWidget
+
+# Pre-rendered at startup for every text style
+DIGITS = '0123456789'
+STATIC_STRINGS = ('Total Damage: ', ' - ', ' / ', 'x')
+
+# Rendered on demand (monster names, special messages) and kept in an LRU
+MAX_CACHED_RUNS = 256
+
+
+class GlyphAtlas:
+    # Cached pixmaps for one (font, colour). Text is split into runs of known
+    # glyphs and static strings, so drawing a damage number is a handful of
+    # blits rather than a fresh shape-and-rasterise through QLabel. Pieces
+    # are (pixmap, width) pairs: pixmaps are rendered at the screen's device
+    # pixel ratio, widths are in logical pixels like the rest of the layout.
+    def __init__(self, font, color, metrics):
+        self.font = font
+        self.color = color
+        self.metrics = metrics
+        self.height = metrics.height()
+        self.ratio = QGuiApplication.instance().devicePixelRatio()
+        self.glyphs = {text: self.render(text) for text in DIGITS}
+        self.statics = {text: self.render(text) for text in STATIC_STRINGS}
+        self.runs = OrderedDict()
+
+    def render(self, text):
+        width = max(1, self.metrics.horizontalAdvance(text))
+        height = max(1, self.height)
+        pixmap = QPixmap(math.ceil(width * self.ratio), math.ceil(height * self.ratio))
+        pixmap.setDevicePixelRatio(self.ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setFont(self.font)
+        painter.setPen(self.color)
+        painter.drawText(0, self.metrics.ascent(), text)
+        painter.end()
+        return pixmap, width
+
+    def run(self, text):
+        piece = self.runs.get(text)
+        if piece is None:
+            piece = self.render(text)
+            self.runs[text] = piece
+            if len(self.runs) > MAX_CACHED_RUNS:
+                self.runs.popitem(last=False)
+        else:
+            self.runs.move_to_end(text)
+        return piece
+
+    def layout(self, text):
+        # [(x, pixmap), ...] for text, and its total width
+        pieces = []
+        x = 0
+        i = 0
+        free_start = None
+        while i < len(text):
+            piece = self.glyphs.get(text[i])
+            length = 1
+            if piece is None:
+                for static in STATIC_STRINGS:
+                    if text.startswith(static, i):
+                        piece = self.statics[static]
+                        length = len(static)
+                        break
+            if piece is None:
+                if free_start is None:
+                    free_start = i
+                i += 1
+                continue
+            if free_start is not None:
+                run, width = self.run(text[free_start:i])
+                pieces.append((x, run))
+                x += width
+                free_start = None
+            pixmap, width = piece
+            pieces.append((x, pixmap))
+            x += width
+            i += length
+        if free_start is not None:
+            run, width = self.run(text[free_start:])
+            pieces.append((x, run))
+            x += width
+        return pieces, x
+
+
+class GlyphLabel(QWidget):
+    # Minimal QLabel replacement that paints its text from a GlyphAtlas
+    def __init__(self, text, atlas: GlyphAtlas, parent=None):
+        super().__init__(parent)
+        self.atlas = atlas
+        self.setAttribute(Qt.WA_TranslucentBackground)
+        self.setText(text)
+
+    def setText(self, text):
+        self._text = text
+        self.pieces, self.text_width = self.atlas.layout(text)
+        self.updateGeometry()
+        self.update()
+
+    def text(self):
+        return self._text
+
+    def sizeHint(self):
+        return QSize(self.text_width, self.atlas.height)
+
+    def minimumSizeHint(self):
+        return self.sizeHint()
+
+    def paintEvent(self, event):
+        # Vertically centred like a QLabel next to a taller icon
+        painter = QPainter(self)
+        y = (self.height() - self.atlas.height) // 2
+        for x, pixmap in self.pieces:
+            painter.drawPixmap(x, y, pixmap)
+        painter.end()
@@ -1,118 +1,318 @@
-import os
+import time
+from collections import deque
 from config import Config
-from .indicators import DamageIndicator, SpecialIndicator, TotalDamageLabel, MonsterNameLabel
+from .indicators import (
+    DamageIndicator, SpecialIndicator, TotalDamageLabel, MonsterNameLabel, RollupIndicator,
+    rollup_text, total_text
+)
+
+# Rows a group shows at most; further hits only add to its running total
+MAX_GROUP_ROWS = 8
+
 
 class GroupIndicator:
-    def __init__(self, damage_events, overlay, category_offset, config: Config, category: str, monster_name: str):
+    def __init__(self, damage_events, overlay, config: Config, category: str, monster_name: str):
         self.damage_events = damage_events
         self.overlay = overlay
-        self.category_offset = category_offset  # Starting vertical offset for this category
+        self.quality = overlay.governor
+        self.styles = overlay.styles
+        self.layout_engine = overlay.layout_engine
+        self.surface = overlay.surface_for(category)  # Parent for the widgets in compact mode
+        self.category_offset = None  # Vertical offset handed out by the category's slot allocator
         self.config = config
         self.font_family = config.font_family
         self.category = category
         self.monster_name = monster_name
-        self.indicators = []
+        self.indicators = deque()
         self.total_label = None
         self.monster_label = None
         self.used_height = 0
+        self.slot_size = 0
+        self.expires_at = 0
+
+        # Running totals for every hit this group has shown
+        self.total_damage = 0
+        self.damage_event_count = 0
+        self.rollups = {}  # spell_name -> live rollup row
+
+        # Rows laid out by stage_events() that are waiting for place(). Nothing
+        # is built until then, so staging costs no widgets.
+        self.staged = []
+        self.staged_damage = 0
+        self.staged_damage_count = 0
+        self.staged_rollups = {}  # spell_name -> [hits, damage] to add to a live rollup row
+        self.staged_total_size = None
+        self.staged_total_offset = 0
+        self.staged_height = 0
+        self.staged_trace = None  # Latency trace of the batch being staged
+
+        self.monster_size = self.layout_engine.label_size(category, 'monster_name', monster_name)
+        self.max_slot_size = self.span_limit()
+
         self.init_group()
 
     def init_group(self):
-        start_x, base_start_y = self.config.start_positions.get(self.category, (960, 100))
+        # Lay the whole group out first so its height is known before the
+        # overlay has to find room for it.
+        self.stage_events(self.damage_events)
 
-        # The actual start_y for this group is base_start_y + category_offset
-        start_y = base_start_y + self.category_offset
+    def top_row_offset(self):
+        return self.monster_size[1] + self.config.padding
+
+    def span_limit(self):
+        # The most a group may span: its label, MAX_GROUP_ROWS rows and the
+        # running total
+        engine = self.layout_engine
+        row_height = engine.icon_row_size(self.category, '0')[1]
+        total_height = engine.label_size(self.category, 'total', total_text(self.monster_name, 0))[1]
+        return (self.top_row_offset() + MAX_GROUP_ROWS * (row_height + self.config.padding)
+                + total_height + 2 * self.config.padding)
+
+    def free_offset(self, height, taken):
+        # First offset below the group's label where a row of height fits
+        # between the (start, end) spans in taken. Spans are visited by
+        # start, so once the row moves past one it can only meet later ones.
+        offset = self.top_row_offset()
+        for start, end in sorted(taken):
+            if start < offset + height + self.config.padding and offset < end:
+                offset = end
+        return offset
+
+    def stage_events(self, events):
+        # Lay out rows for new events and return the slot size the group needs
+        # to show them
+        self.drop_faded_rows(time.monotonic())
+        self.staged_trace = events[0].get('trace') if events else None
+
+        engine = self.layout_engine
+        new_rollups = {}
+        room = MAX_GROUP_ROWS - len(self.indicators)
+        for event in events:
+            spell_name = event['spell_name']
+            icon_path = self.overlay.spells.icon_path(spell_name)
+            if not icon_path:
+                continue
+
+            if event['type'] == 'damage':
+                self.staged_damage += event['damage']
+                self.staged_damage_count += 1
 
-        cat_conf = self.config.spell_categories[self.category]
-        monster_name_font_size = cat_conf['monster_name_font_size']
+            if event.get('rollup'):
+                # Fold the hit into its spell's rollup row, adding the row only once
+                if spell_name in self.rollups:
+                    pending = self.staged_rollups.setdefault(spell_name, [0, 0])
+                    pending[0] += 1
+                    pending[1] += event['damage']
+                elif spell_name in new_rollups:
+                    row = new_rollups[spell_name]
+                    row['hits'] += 1
+                    row['damage'] += event['damage']
+                elif len(self.staged) < room:
+                    row = {'event': event, 'icon_path': icon_path, 'spell_name': spell_name,
+                           'hits': 1, 'damage': event['damage']}
+                    new_rollups[spell_name] = row
+                    self.staged.append(row)
+            elif len(self.staged) < room:
+                self.staged.append({'event': event, 'icon_path': icon_path})
 
-        # Place monster name label at the top
-        monster_label_y = start_y
-        self.monster_label = MonsterNameLabel(
-            self.monster_name,
-            start_x,
-            monster_label_y,
+        # The whole group floats down together from its last hit, so new rows
+        # can take the first gap faded rows have left, and the running total
+        # goes under the lowest row
+        padding = self.config.padding
+        taken = [(row['offset'], row['offset'] + row['size'][1] + padding) for row in self.indicators]
+        for row in self.staged:
+            row['size'] = engine.icon_row_size(self.category, self.row_text(row))
+            row['offset'] = self.free_offset(row['size'][1], taken)
+            taken.append((row['offset'], row['offset'] + row['size'][1] + padding))
+        cursor = max((end for _, end in taken), default=self.top_row_offset())
+        self.staged_total_offset = cursor
+
+        # Show a running total once the group has seen at least two hits
+        if self.damage_event_count + self.staged_damage_count >= 2:
+            self.staged_total_size = engine.label_size(
+                self.category, 'total',
+                total_text(self.monster_name, self.total_damage + self.staged_damage)
+            )
+            cursor += self.staged_total_size[1] + self.config.padding
+
+        # Track how much vertical space this group uses, and the span it
+        # reserves in the category's stack including the gap to the next
+        # group. Space the faded rows used is given back.
+        self.staged_height = cursor
+        return self.staged_height + self.config.padding
+
+    def row_text(self, row):
+        event = row['event']
+        if 'hits' in row:
+            return rollup_text(row['hits'], row['damage'])
+        elif event['type'] == 'damage':
+            return str(event['damage'])
+        return event['message']
+
+    def build_indicator(self, row):
+        event = row['event']
+        common = dict(parent=self.surface, quality=self.quality, styles=self.styles, size=row['size'])
+
+        if 'hits' in row:
+            return RollupIndicator(
+                row['hits'],
+                row['damage'],
+                row['icon_path'],
+                self.font_family,
+                self.config,
+                self.category,
+                **common
+            )
+        elif event['type'] == 'damage':
+            return DamageIndicator(
+                event['damage'],
+                row['icon_path'],
+                self.font_family,
+                self.config,
+                self.category,
+                **common
+            )
+        return SpecialIndicator(
+            event['message'],
+            row['icon_path'],
             self.font_family,
             self.config,
-            self.category
+            self.category,
+            **common
         )
-        self.monster_label.show()
 
-        current_y = monster_label_y + self.monster_label.height() + self.config.padding
+    def discard_staged(self):
+        self.staged = []
+        self.staged_damage = 0
+        self.staged_damage_count = 0
+        self.staged_rollups = {}
+        self.staged_total_size = None
+        self.staged_total_offset = 0
+        self.staged_trace = None
 
-        # Place damage and special indicators
-        for event in self.damage_events:
-            if event['type'] == 'damage':
-                damage = event['damage']
-                spell_name = event['spell_name']
-                icon_path = self.config.spells_dict.get(spell_name, {}).get('icon_path', None)
-                if not icon_path or not os.path.exists(icon_path):
-                    continue
-
-                indicator = DamageIndicator(
-                    damage,
-                    icon_path,
-                    start_x,
-                    current_y,
-                    self.font_family,
-                    self.config,
-                    self.category
-                )
-                indicator.show()
-                self.indicators.append({'widget': indicator, 'category': self.category})
-                current_y += indicator.height() + self.config.padding
-
-            elif event['type'] == 'special':
-                message = event['message']
-                spell_name = event['spell_name']
-                icon_path = self.config.spells_dict.get(spell_name, {}).get('icon_path', None)
-                if not icon_path or not os.path.exists(icon_path):
-                    continue
-
-                indicator = SpecialIndicator(
-                    message,
-                    icon_path,
-                    start_x,
-                    current_y,
-                    self.font_family,
-                    self.config,
-                    self.category
-                )
-                indicator.show()
-                self.indicators.append({'widget': indicator, 'category': self.category})
-                current_y += indicator.height() + self.config.padding
-
-        # Calculate total damage if needed
-        category_damage = sum(e['damage'] for e in self.damage_events if e['type'] == 'damage')
-        damage_event_count = len([event for event in self.damage_events if event['type'] == 'damage'])
-
-        if damage_event_count >= 2:
-            self.total_label = TotalDamageLabel(
-                category_damage,
-                start_x,
-                current_y,
+    def move_to(self, category_offset):
+        # Take a new span in the category's stack, carrying the live widgets
+        # along with their float still running
+        dy = category_offset - self.category_offset
+        self.category_offset = category_offset
+        for widget in self.widgets():
+            widget.shift(0, dy)
+
+    def drop_faded_rows(self, now):
+        # A restarted rollup row outlives the rows placed after it, so faded
+        # rows are looked for all through the group, freeing their room
+        live = deque()
+        for row in self.indicators:
+            if row['expires_at'] > now:
+                live.append(row)
+                continue
+            if self.rollups.get(row.get('spell_name')) is row:
+                del self.rollups[row['spell_name']]
+            row['widget'].teardown()
+        self.indicators = live
+
+    def place(self, category_offset=None):
+        # Build and show the staged rows below the live ones, move the running
+        # total under them and restart the labels so they stay up while hits land.
+        if category_offset is not None:
+            self.category_offset = category_offset
+
+        # Live rollup rows take the new hits in place; size them for their new text
+        for spell_name, (hits, damage) in self.staged_rollups.items():
+            row = self.rollups[spell_name]
+            row['hits'] += hits
+            row['damage'] += damage
+            row['size'] = self.layout_engine.icon_row_size(self.category, self.row_text(row))
+
+        # The widest row of this batch tells a category surface how much room to make
+        widths = [self.monster_size[0]] + [row['size'][0] for row in self.staged]
+        widths += [self.rollups[spell_name]['size'][0] for spell_name in self.staged_rollups]
+        if self.staged_total_size:
+            widths.append(self.staged_total_size[0])
+        start_x, base_start_y = self.overlay.group_origin(
+            self.category, max(widths), self.category_offset + self.staged_height + self.config.padding
+        )
+
+        # The actual start_y for this group is base_start_y + category_offset
+        start_y = base_start_y + self.category_offset
+        expires_at = time.monotonic() + self.quality.animation_duration(self.config) / 1000
+        self.expires_at = max(self.expires_at, expires_at)
+
+        if self.monster_label is None:
+            self.monster_label = MonsterNameLabel(
+                self.monster_name,
                 self.font_family,
                 self.config,
                 self.category,
-                monster_name=self.monster_name
+                parent=self.surface,
+                quality=self.quality,
+                styles=self.styles,
+                size=self.monster_size
             )
-            self.total_label.show()
-            current_y += self.total_label.height() + self.config.padding
+        self.monster_label.place(start_x, start_y)
+
+        # Rows already up start their float over with the group, keeping their fade
+        restarted = [self.rollups[spell_name] for spell_name in self.staged_rollups]
+        for row in self.indicators:
+            if not any(row is other for other in restarted):
+                row['widget'].refloat(start_x, start_y + row['offset'])
 
-        # Track how much vertical space this group used
-        self.used_height = current_y - monster_label_y
+        for row in restarted:
+            row['widget'].set_rollup(row['hits'], row['damage'], row['size'])
+            row['widget'].trace = self.staged_trace
+            row['widget'].place(start_x, start_y + row['offset'])
+            row['expires_at'] = expires_at
+
+        for row in self.staged:
+            row['widget'] = self.build_indicator(row)
+            row['widget'].trace = self.staged_trace
+            row['category'] = self.category
+            row['widget'].place(start_x, start_y + row['offset'])
+            row['expires_at'] = expires_at
+            self.indicators.append(row)
+            if 'hits' in row:
+                self.rollups[row['spell_name']] = row
+
+        self.total_damage += self.staged_damage
+        self.damage_event_count += self.staged_damage_count
+        if self.staged_total_size:
+            if self.total_label is None:
+                self.total_label = TotalDamageLabel(
+                    self.total_damage,
+                    self.font_family,
+                    self.config,
+                    self.category,
+                    parent=self.surface,
+                    monster_name=self.monster_name,
+                    quality=self.quality,
+                    styles=self.styles,
+                    size=self.staged_total_size
+                )
+            else:
+                self.total_label.set_total(self.total_damage, self.staged_total_size)
+            self.total_label.trace = self.staged_trace
+            self.total_label.place(start_x, start_y + self.staged_total_offset)
+
+        self.used_height = self.staged_height
+        self.slot_size = self.used_height + self.config.padding
+        self.discard_staged()
 
     def final_group_height(self):
         # Return the total vertical space consumed by this group
         return self.used_height
 
-    def is_active(self):
-        active = True
-        if self.monster_label and not self.monster_label.isVisible():
-            active = False
-        for ind in self.indicators:
-            if not ind['widget'].isVisible():
-                active = False
-        if self.total_label and not self.total_label.isVisible():
-            active = False
-        return active
+    def widgets(self):
+        widgets = [self.monster_label] if self.monster_label else []
+        widgets += [ind['widget'] for ind in self.indicators]
+        if self.total_label:
+            widgets.append(self.total_label)
+        return widgets
+
+    def teardown(self):
+        self.discard_staged()
+        for widget in self.widgets():
+            widget.teardown()
+        self.indicators.clear()
+        self.rollups.clear()
+        self.total_label = None
+        self.monster_label = None
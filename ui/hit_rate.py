@@ -0,0 +1,25 @@
+from collections import deque
+
+
+class HitRateTracker:
+    # Counts hits per key over a sliding window so the overlay can tell when
+    # a spell is landing fast enough to be rolled up into a single row.
+    def __init__(self, window=1.0):
+        self.window = window
+        self._hits = {}
+
+    def record(self, key, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            hits = self._hits[key] = deque()
+        hits.append(now)
+        cutoff = now - self.window
+        while hits[0] <= cutoff:
+            hits.popleft()
+        return len(hits)
+
+    def prune(self, now):
+        # Forget keys that have gone quiet so the table does not grow over a session
+        cutoff = now - self.window
+        for key in [key for key, hits in self._hits.items() if hits[-1] <= cutoff]:
+            del self._hits[key]
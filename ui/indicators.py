@@ -1,266 +1,261 @@
-from PyQt5 import QtCore, QtGui, QtWidgets
-from PyQt5.QtCore import Qt, QPoint
-from PyQt5.QtGui import QFont
-from PyQt5.QtWidgets import QLabel, QWidget, QHBoxLayout
+from PyQt5 import QtCore, QtWidgets
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QLabel, QHBoxLayout
 from config import Config
+from metrics import latency
+from .style_cache import StyleCache
+from .glyph_atlas import GlyphLabel
+from .layout_engine import ICON_ROW_MARGINS, LABEL_ROW_MARGINS, ROW_SPACING
 
 
-class DamageIndicator(QtWidgets.QWidget):
-    def __init__(self, damage, spell_icon, x, y, font_family, config: Config, category: str, parent=None):
-        super().__init__(parent)
-        self.damage = int(damage)
-        self.spell_icon = spell_icon
-        self.font_family = font_family
-        self.config = config
-        self.category = category
+def rollup_text(hit_count, damage):
+    return f"x{hit_count} / {damage}"
 
-        cat_conf = self.config.spell_categories[self.category]
 
-        self.icon_width = cat_conf['icon_width']
-        self.icon_height = cat_conf['icon_height']
-        self.font_size = cat_conf['font_size']
-        self.text_color = cat_conf['text_color']
+def total_text(monster_name, total_damage):
+    if monster_name:
+        return f"{monster_name} - Total Damage: {total_damage}"
+    return f"Total Damage: {total_damage}"
 
-        self.initUI()
 
-        self.setWindowFlags(
-            Qt.WindowStaysOnTopHint |
-            Qt.FramelessWindowHint |
-            Qt.Tool |
-            Qt.WindowTransparentForInput
-        )
+class FloatingIndicator(QtWidgets.QWidget):
+    # Shared window setup and float/fade animation for every overlay widget.
+    # Subclasses build their contents, then the owning group decides where the
+    # widget goes and calls place() once it has a slot for it.
+    def __init__(self, font_family, config: Config, category: str, parent=None, quality=None, styles=None, size=None):
+        super().__init__(parent)
+        self.font_family = font_family
+        self.config = config
+        self.category = category
+        self.quality = quality  # QualityGovernor deciding how much animation we can afford
+        self.styles = styles if styles is not None else StyleCache(config)
+        self.layout_size = size  # (width, height) worked out by the LayoutEngine, if any
+        self.animation = None
+        self.fade_animation = None
+        self.trace = None  # Latency trace of the batch this widget was last placed for
+
+    def init_window(self):
+        # Indicators are their own windows unless a category surface holds them
+        if self.parent() is None:
+            self.setWindowFlags(
+                Qt.WindowStaysOnTopHint |
+                Qt.FramelessWindowHint |
+                Qt.Tool |
+                Qt.WindowTransparentForInput
+            )
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.setAttribute(Qt.WA_TransparentForMouseEvents)
 
-        self.adjustSize()
-        self.move(x - self.width() // 2, y)
-
-        self.animation = QtCore.QPropertyAnimation(self, b'pos')
-        self.animation.setDuration(self.config.animation_duration)
-        self.animation.setStartValue(self.pos())
-        self.animation.setEndValue(QtCore.QPoint(self.x(), self.y() + self.config.float_distance))
-        self.animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
-        self.animation.start()
+        self.resize_to(self.layout_size)
 
-        self.opacity_effect = QtWidgets.QGraphicsOpacityEffect()
-        self.setGraphicsEffect(self.opacity_effect)
-        self.fade_animation = QtCore.QPropertyAnimation(self.opacity_effect, b'opacity')
-        self.fade_animation.setDuration(self.config.animation_duration)
-        self.fade_animation.setStartValue(self.config.opacity)
-        self.fade_animation.setEndValue(0)
-        self.fade_animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
-        self.fade_animation.start()
-        self.fade_animation.finished.connect(self.close)
+    def resize_to(self, size):
+        # Take the precomputed size when there is one; only fall back to a
+        # layout pass for widgets built outside a group
+        if size:
+            self.layout_size = size
+            self.setFixedSize(*size)
+        else:
+            self.adjustSize()
 
-    def initUI(self):
+    def make_row_layout(self, margins):
         layout = QHBoxLayout()
-        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setContentsMargins(*margins)
+        layout.setSpacing(ROW_SPACING)
+        return layout
 
-        icon_label = QLabel()
-        pixmap = QtGui.QPixmap(self.spell_icon)
-        if pixmap.isNull():
-            print(f"Failed to load icon: {self.spell_icon}")
-        pixmap = pixmap.scaled(
-            self.icon_width, self.icon_height,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        icon_label.setPixmap(pixmap)
-        layout.addWidget(icon_label)
-
-        damage_label = QLabel(str(self.damage))
-        damage_label.setStyleSheet(f"color: {self.text_color};")
-        damage_label.setFont(QFont(self.font_family, self.font_size))
-        layout.addWidget(damage_label)
-
-        self.setLayout(layout)
-        self.adjustSize()
+    def make_label(self, text, role):
+        # Paint text from the role's pre-rendered glyph atlas
+        return GlyphLabel(text, self.styles.style(self.category, role).atlas)
 
+    def make_icon_label(self, spell_icon):
+        cat_conf = self.config.spell_categories[self.category]
+        icon_label = QLabel()
+        icon_label.setFixedSize(cat_conf['icon_width'], cat_conf['icon_height'])
+        icon_label.setAlignment(Qt.AlignCenter)
+        icon_label.setPixmap(self.styles.icon(
+            spell_icon,
+            cat_conf['icon_width'], cat_conf['icon_height'],
+            self.transform_mode()
+        ))
+        return icon_label
+
+    def animation_duration(self):
+        if self.quality:
+            return self.quality.animation_duration(self.config)
+        return self.config.animation_duration
+
+    def fade_enabled(self):
+        return self.quality.fade_enabled() if self.quality else True
+
+    def transform_mode(self):
+        return self.quality.transform_mode() if self.quality else Qt.SmoothTransformation
+
+    def place(self, x, y):
+        # Placing an indicator that is already on screen restarts its float
+        # and fade from the new position, which keeps running labels alive.
+        self.move(x - self.width() // 2, y)
 
-class SpecialIndicator(QtWidgets.QWidget):
-    def __init__(self, message, spell_icon, x, y, font_family, config: Config, category: str, parent=None):
-        super().__init__(parent)
-        self.message = message
-        self.spell_icon = spell_icon
-        self.font_family = font_family
-        self.config = config
-        self.category = category
+        if self.animation is None:
+            self.animation = QtCore.QPropertyAnimation(self, b'pos')
+            self.animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
+            self.animation.finished.connect(self.close)
 
-        cat_conf = self.config.spell_categories[self.category]
+            self.opacity_effect = QtWidgets.QGraphicsOpacityEffect()
+            self.setGraphicsEffect(self.opacity_effect)
+            self.fade_animation = QtCore.QPropertyAnimation(self.opacity_effect, b'opacity')
+            self.fade_animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
+        else:
+            self.animation.stop()
+            self.fade_animation.stop()
 
-        self.icon_width = cat_conf['icon_width']
-        self.icon_height = cat_conf['icon_height']
-        self.font_size = cat_conf['font_size']
-        self.text_color = cat_conf['text_color']
+        duration = self.animation_duration()
+        self.animation.setDuration(duration)
+        self.animation.setStartValue(self.pos())
+        self.animation.setEndValue(QtCore.QPoint(self.x(), self.y() + self.config.float_distance))
+        self.animation.start()
 
-        self.initUI()
+        if self.fade_enabled():
+            self.fade_animation.setDuration(duration)
+            self.fade_animation.setStartValue(self.config.opacity)
+            self.fade_animation.setEndValue(0)
+            self.fade_animation.start()
+        else:
+            self.opacity_effect.setOpacity(self.config.opacity)
 
-        self.setWindowFlags(
-            Qt.WindowStaysOnTopHint |
-            Qt.FramelessWindowHint |
-            Qt.Tool |
-            Qt.WindowTransparentForInput
-        )
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.show()
 
-        self.adjustSize()
+    def refloat(self, x, y):
+        # Start the float over from a new position, leaving the fade to run
+        # on, so a group's rows move back up with it when it takes a hit
+        if self.animation is None:
+            self.place(x, y)
+            return
+        self.animation.stop()
         self.move(x - self.width() // 2, y)
-
-        self.animation = QtCore.QPropertyAnimation(self, b'pos')
-        self.animation.setDuration(self.config.animation_duration)
         self.animation.setStartValue(self.pos())
         self.animation.setEndValue(QtCore.QPoint(self.x(), self.y() + self.config.float_distance))
-        self.animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
         self.animation.start()
 
-        self.opacity_effect = QtWidgets.QGraphicsOpacityEffect()
-        self.setGraphicsEffect(self.opacity_effect)
-        self.fade_animation = QtCore.QPropertyAnimation(self.opacity_effect, b'opacity')
-        self.fade_animation.setDuration(self.config.animation_duration)
-        self.fade_animation.setStartValue(self.config.opacity)
-        self.fade_animation.setEndValue(0)
-        self.fade_animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
-        self.fade_animation.start()
-        self.fade_animation.finished.connect(self.close)
+    def paintEvent(self, event):
+        if self.trace is not None:
+            latency.painted(self.trace)
+            self.trace = None
+        super().paintEvent(event)
+
+    def shift(self, dx, dy):
+        # Move with the float animation still running, e.g. when the
+        # surface holding this indicator is widened
+        self.move(self.x() + dx, self.y() + dy)
+        if self.animation is not None:
+            offset = QtCore.QPoint(dx, dy)
+            self.animation.setStartValue(self.animation.startValue() + offset)
+            self.animation.setEndValue(self.animation.endValue() + offset)
+
+    def teardown(self):
+        # Stop the animations and hand the widget back to Qt for deletion
+        for animation in (self.animation, self.fade_animation):
+            if animation:
+                animation.stop()
+        self.deleteLater()
+
+
+class DamageIndicator(FloatingIndicator):
+    def __init__(self, damage, spell_icon, font_family, config: Config, category: str, parent=None, quality=None, styles=None, size=None):
+        super().__init__(font_family, config, category, parent, quality, styles, size)
+        self.damage = int(damage)
+        self.spell_icon = spell_icon
+
+        self.initUI()
+        self.init_window()
 
     def initUI(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(10, 10, 10, 10)
+        layout = self.make_row_layout(ICON_ROW_MARGINS)
 
-        icon_label = QLabel()
-        pixmap = QtGui.QPixmap(self.spell_icon)
-        if pixmap.isNull():
-            print(f"Failed to load icon: {self.spell_icon}")
-        pixmap = pixmap.scaled(
-            self.icon_width, self.icon_height,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation
-        )
-        icon_label.setPixmap(pixmap)
-        layout.addWidget(icon_label)
-
-        message_label = QLabel(self.message)
-        message_label.setStyleSheet(f"color: {self.text_color};")
-        message_label.setFont(QFont(self.font_family, self.font_size))
-        layout.addWidget(message_label)
+        layout.addWidget(self.make_icon_label(self.spell_icon))
+
+        self.damage_label = self.make_label(self.damage_text(), 'text')
+        layout.addWidget(self.damage_label)
 
         self.setLayout(layout)
-        self.adjustSize()
 
+    def damage_text(self):
+        return str(self.damage)
 
-class TotalDamageLabel(QtWidgets.QWidget):
-    def __init__(self, total_damage, x, y, font_family, config: Config, category: str, parent=None, monster_name=None):
-        super().__init__(parent)
-        self.total_damage = total_damage
-        self.font_family = font_family
-        self.config = config
-        self.category = category
-        self.monster_name = monster_name
 
-        # Use the category's font size as base, then apply ratio
-        base_font_size = self.config.spell_categories[self.category]['font_size']
-        self.calculated_total_font_size = int(base_font_size * self.config.total_font_ratio)
-        self.text_color = self.config.total_color
+class RollupIndicator(DamageIndicator):
+    # A single row standing in for every hit of one spell once it lands
+    # faster than Config.rollup_threshold per second
+    def __init__(self, hit_count, total_damage, spell_icon, font_family, config: Config, category: str, parent=None, quality=None, styles=None, size=None):
+        self.hit_count = hit_count
+        super().__init__(total_damage, spell_icon, font_family, config, category, parent, quality, styles, size)
 
-        self.initUI()
+    def damage_text(self):
+        return rollup_text(self.hit_count, self.damage)
 
-        self.setWindowFlags(
-            Qt.WindowStaysOnTopHint |
-            Qt.FramelessWindowHint |
-            Qt.Tool |
-            Qt.WindowTransparentForInput
-        )
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+    def set_rollup(self, hit_count, total_damage, size=None):
+        self.hit_count = hit_count
+        self.damage = int(total_damage)
+        self.damage_label.setText(self.damage_text())
+        self.resize_to(size)
 
-        self.adjustSize()
-        self.move(x - self.width() // 2, y)
 
-        self.animation = QtCore.QPropertyAnimation(self, b'pos')
-        self.animation.setDuration(self.config.animation_duration)
-        self.animation.setStartValue(self.pos())
-        self.animation.setEndValue(QtCore.QPoint(self.x(), self.y() + self.config.float_distance))
-        self.animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
-        self.animation.start()
+class SpecialIndicator(FloatingIndicator):
+    def __init__(self, message, spell_icon, font_family, config: Config, category: str, parent=None, quality=None, styles=None, size=None):
+        super().__init__(font_family, config, category, parent, quality, styles, size)
+        self.message = message
+        self.spell_icon = spell_icon
 
-        self.opacity_effect = QtWidgets.QGraphicsOpacityEffect()
-        self.setGraphicsEffect(self.opacity_effect)
-        self.fade_animation = QtCore.QPropertyAnimation(self.opacity_effect, b'opacity')
-        self.fade_animation.setDuration(self.config.animation_duration)
-        self.fade_animation.setStartValue(self.config.opacity)
-        self.fade_animation.setEndValue(0)
-        self.fade_animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
-        self.fade_animation.start()
-        self.fade_animation.finished.connect(self.close)
+        self.initUI()
+        self.init_window()
 
     def initUI(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(10, 5, 10, 5)
+        layout = self.make_row_layout(ICON_ROW_MARGINS)
 
-        if self.monster_name:
-            total_label = QLabel(f"{self.monster_name} - Total Damage: {self.total_damage}")
-        else:
-            total_label = QLabel(f"Total Damage: {self.total_damage}")
-        total_label.setStyleSheet(f"color: {self.text_color};")
-        total_label.setFont(QFont(self.font_family, self.calculated_total_font_size))
-        layout.addWidget(total_label)
+        layout.addWidget(self.make_icon_label(self.spell_icon))
+
+        layout.addWidget(self.make_label(self.message, 'text'))
 
         self.setLayout(layout)
-        self.adjustSize()
 
 
-class MonsterNameLabel(QtWidgets.QWidget):
-    def __init__(self, monster_name, x, y, font_family, config: Config, category: str, parent=None):
-        super().__init__(parent)
+class TotalDamageLabel(FloatingIndicator):
+    def __init__(self, total_damage, font_family, config: Config, category: str, parent=None, monster_name=None, quality=None, styles=None, size=None):
+        super().__init__(font_family, config, category, parent, quality, styles, size)
+        self.total_damage = total_damage
         self.monster_name = monster_name
-        self.font_family = font_family
-        self.config = config
-        self.category = category
-
-        cat_conf = self.config.spell_categories[self.category]
-        self.font_size = cat_conf['monster_name_font_size']
-        self.text_color = cat_conf['monster_name_text_color']
 
         self.initUI()
+        self.init_window()
 
-        self.setWindowFlags(
-            Qt.WindowStaysOnTopHint |
-            Qt.FramelessWindowHint |
-            Qt.Tool |
-            Qt.WindowTransparentForInput
-        )
-        self.setAttribute(Qt.WA_TranslucentBackground)
-        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+    def initUI(self):
+        layout = self.make_row_layout(LABEL_ROW_MARGINS)
 
-        self.adjustSize()
-        self.move(x - self.width() // 2, y)
+        # The total uses the category's font size scaled by Config.total_font_ratio
+        self.text_label = self.make_label(self.total_text(), 'total')
+        layout.addWidget(self.text_label)
 
-        self.animation = QtCore.QPropertyAnimation(self, b'pos')
-        self.animation.setDuration(self.config.animation_duration)
-        self.animation.setStartValue(self.pos())
-        self.animation.setEndValue(QtCore.QPoint(self.x(), self.y() + self.config.float_distance))
-        self.animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
-        self.animation.start()
+        self.setLayout(layout)
+
+    def total_text(self):
+        return total_text(self.monster_name, self.total_damage)
+
+    def set_total(self, total_damage, size=None):
+        self.total_damage = total_damage
+        self.text_label.setText(self.total_text())
+        self.resize_to(size)
 
-        self.opacity_effect = QtWidgets.QGraphicsOpacityEffect()
-        self.setGraphicsEffect(self.opacity_effect)
-        self.fade_animation = QtCore.QPropertyAnimation(self.opacity_effect, b'opacity')
-        self.fade_animation.setDuration(self.config.animation_duration)
-        self.fade_animation.setStartValue(self.config.opacity)
-        self.fade_animation.setEndValue(0)
-        self.fade_animation.setEasingCurve(QtCore.QEasingCurve.OutCubic)
-        self.fade_animation.start()
-        self.fade_animation.finished.connect(self.close)
+
+class MonsterNameLabel(FloatingIndicator):
+    def __init__(self, monster_name, font_family, config: Config, category: str, parent=None, quality=None, styles=None, size=None):
+        super().__init__(font_family, config, category, parent, quality, styles, size)
+        self.monster_name = monster_name
+
+        self.initUI()
+        self.init_window()
 
     def initUI(self):
-        layout = QHBoxLayout()
-        layout.setContentsMargins(10, 5, 10, 5)
+        layout = self.make_row_layout(LABEL_ROW_MARGINS)
 
-        name_label = QLabel(self.monster_name)
-        name_label.setStyleSheet(f"color: {self.text_color};")
-        name_label.setFont(QFont(self.font_family, self.font_size))
-        layout.addWidget(name_label)
+        layout.addWidget(self.make_label(self.monster_name, 'monster_name'))
 
         self.setLayout(layout)
-        self.adjustSize()
@@ -0,0 +1,39 @@
+# Pure-Python sizing for overlay rows. Nothing here touches Qt: text is measured
+# through the callable handed in (StyleCache.measure in the app), so a whole
+# group can be laid out before any widget exists, and without a display.
+
+# Contents margins (left, top, right, bottom) of each kind of row
+ICON_ROW_MARGINS = (10, 10, 10, 10)
+LABEL_ROW_MARGINS = (10, 5, 10, 5)
+
+# Gap between the icon and the text of an icon row
+ROW_SPACING = 6
+
+
+class LayoutEngine:
+    def __init__(self, config, measure):
+        self.config = config
+        self.measure = measure  # measure(category, role, text) -> (width, height)
+
+    def label_size(self, category, role, text):
+        left, top, right, bottom = LABEL_ROW_MARGINS
+        text_width, text_height = self.measure(category, role, text)
+        return left + text_width + right, top + text_height + bottom
+
+    def icon_row_size(self, category, text):
+        cat_conf = self.config.spell_categories[category]
+        left, top, right, bottom = ICON_ROW_MARGINS
+        text_width, text_height = self.measure(category, 'text', text)
+        width = left + cat_conf['icon_width'] + ROW_SPACING + text_width + right
+        height = top + max(cat_conf['icon_height'], text_height) + bottom
+        return width, height
+
+    def stack(self, sizes, start=0):
+        # Offsets for sizes stacked top to bottom with Config.padding between
+        # them, and the offset right after the last one
+        offsets = []
+        cursor = start
+        for _, height in sizes:
+            offsets.append(cursor)
+            cursor += height + self.config.padding
+        return offsets, cursor
@@ -1,23 +1,120 @@
+import os
+import time
+import sqlite3
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import pyqtSignal, Qt
 from PyQt5.QtWidgets import QWidget, QLabel
 from config import Config
+from spell_db import SpellTable
+from dps import DpsEngine
+from encounters import EncounterTracker
+from event_history import EventHistory
+from damage_stats import DamageSketches
+from metrics import latency, metrics, startup
+from utils import process_rss_bytes
 from .group_indicator import GroupIndicator
+from .slot_allocator import SlotAllocator
+from .expiry_scheduler import ExpiryScheduler
+from .hit_rate import HitRateTracker
+from .quality_governor import QualityGovernor
+from .style_cache import StyleCache
+from .layout_engine import LayoutEngine
+from .category_surface import CategorySurface
+from .debug_hud import DebugHud
+from .dps_readout import DpsReadout
+
+# Group that spell-scoped rollups are collected under
+ROLLUP_GROUP_NAME = 'Multiple targets'
+
+# How often the event loop is sampled for the quality governor
+FRAME_PROBE_INTERVAL_MS = 50
 
 class OverlayWindow(QWidget):
     damage_received = pyqtSignal(list)
 
-    def __init__(self, config: Config):
+    def __init__(self, config: Config, spells: SpellTable = None):
         super().__init__()
-        self.groups = []
+        self.groups = set()
+        self.live_groups = {}  # (category, monster_name) -> group still on screen
         self.config = config
+        self.governor = QualityGovernor(self.config.frame_budget_ms)
+        self.styles = StyleCache(self.config)
+        self.layout_engine = LayoutEngine(self.config, self.styles.measure)
+        self.compact = self.config.overlay_mode == 'compact'
+        self.first_frame_at = None  # perf_counter() of the first paint
+        self.surfaces = {}  # category -> CategorySurface, compact mode only
         self.initUI()
 
-        # Create a dictionary to track vertical offsets for each category
-        # This ensures each new group is placed below the previous ones.
-        self.category_offsets = {cat: 0 for cat in self.config.start_positions.keys()}
+        # One slot allocator per category hands out vertical spans below the
+        # category's start position and reclaims them as groups expire.
+        self.allocators = {cat: SlotAllocator() for cat in self.config.start_positions.keys()}
+
+        # Groups are retired by deadline on their own timer rather than by
+        # polling every widget whenever new damage arrives.
+        self.expiry = ExpiryScheduler()
+        self.expiry_timer = QtCore.QTimer(self)
+        self.expiry_timer.setSingleShot(True)
+        self.expiry_timer.timeout.connect(self.expire_groups)
+
+        # Hits per second per spell, used to fold bursts into rollup rows
+        self.hit_rates = HitRateTracker()
+
+        # A repeating timer whose lateness tells the governor how far behind
+        # the event loop is running
+        self.frame_probe = QtCore.QTimer(self)
+        self.frame_probe.setTimerType(Qt.PreciseTimer)
+        self.frame_probe.timeout.connect(self.sample_frame_time)
+        self.last_probe = time.monotonic()
+        self.frame_probe.start(FRAME_PROBE_INTERVAL_MS)
+
+        # Once nothing is live and no events have arrived for idle_timeout,
+        # every timer stops until the next batch wakes the overlay up
+        self.idle = False
+        self.last_event_time = time.monotonic()
+        self.idle_started = 0.0
+        self.idle_cpu_started = 0.0
+        self.last_idle_cpu_percent = None
+        self.idle_timer = QtCore.QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.enter_idle)
+        self.arm_idle_timer()
+
+        # Feed the metrics registry; gauges are only read when the HUD refreshes
+        metrics.gauge('live_groups', lambda: len(self.groups))
+        metrics.gauge('live_widgets', lambda: sum(len(group.widgets()) for group in self.groups))
+        metrics.gauge('frame_ms', lambda: self.governor.frame_ms)
+        metrics.gauge('quality', lambda: self.governor.level_name)
+        metrics.gauge('queue_depth', lambda: max(0, metrics.counter('batches_emitted') - metrics.counter('batches_shown')))
+        metrics.gauge('rss', process_rss_bytes)
+        # CPU the process used over the last idle spell, as a percentage
+        metrics.gauge('idle_cpu', self.idle_cpu_percent)
 
-        self.config.spells_dict = {spell['spell_name']: spell for spell in self.config.spells}
+        # Live damage per second and the session's damage distributions, fed
+        # from every batch the handler sends
+        self.dps = DpsEngine()
+        self.damage_stats = DamageSketches()
+        self.dps_readout = None
+
+        # Fights per monster, closed on death, mez or going idle
+        self.encounters = EncounterTracker()
+        metrics.gauge('encounters_active', lambda: len(self.encounters.active))
+        metrics.gauge('encounters_closed', lambda: self.encounters.closed_count)
+
+        # Every event, written to SQLite off the GUI thread when history_db_path is set
+        self.history = None
+        self.update_history()
+        # and damage events to the column store when column_store_path is set
+        self.column_store = None
+        self.update_column_store()
+
+        self.hud = None
+        self.hud_visible = False
+        if self.config.debug_hud:
+            self.toggle_hud()
+        self.update_dps_readout()
+
+        # Spell names -> category and icon, for the config's spells and any imported ones
+        self.spells = spells if spells is not None else SpellTable.load(self.config)
         self.damage_received.connect(self.show_damage)
 
     def initUI(self):
@@ -29,55 +126,361 @@ class OverlayWindow(QWidget):
         )
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.screen = QtWidgets.QApplication.primaryScreen().availableGeometry()
-        self.setGeometry(self.screen)
         self.setAttribute(Qt.WA_TransparentForMouseEvents)
 
         self.category_boxes = {}
-        for category in self.config.start_positions.keys():
-            box = QLabel(self)
-            box.setText(category.replace('_', ' ').capitalize())
-            box.setStyleSheet("color: white; background-color: rgba(255, 0, 0, 150); padding: 5px;")
-            box.adjustSize()
-            x, y = self.config.start_positions[category]
+        if self.compact:
+            # Nothing is drawn on this window; each category gets its own
+            # surface the first time it has something to show
+            self.setGeometry(self.screen.x(), self.screen.y(), 0, 0)
+            return
+
+        self.setGeometry(self.screen)
+        self.place_category_boxes()
+
+    def place_category_boxes(self):
+        for category, (x, y) in self.config.start_positions.items():
+            box = self.category_boxes.get(category)
+            if box is None:
+                box = QLabel(self)
+                box.setText(category.replace('_', ' ').capitalize())
+                box.setStyleSheet("color: white; background-color: rgba(255, 0, 0, 150); padding: 5px;")
+                box.adjustSize()
+                box.show()
+                self.category_boxes[category] = box
             box.move(x - box.width() // 2, y - box.height() // 2)
-            box.show()
-            self.category_boxes[category] = box
+        for category in list(self.category_boxes):
+            if category not in self.config.start_positions:
+                self.category_boxes.pop(category).deleteLater()
+
+    def paintEvent(self, event):
+        if self.first_frame_at is None:
+            self.first_frame_at = time.perf_counter()
+            startup.frame_shown()
+        super().paintEvent(event)
 
     @QtCore.pyqtSlot(list)
     def show_damage(self, damage_events):
         if not damage_events:
             return
+        trace = damage_events[0].get('trace')
+        latency.mark(trace, 'received')
+        metrics.count('batches_shown')
+        metrics.count('events_shown', len(damage_events))
+
+        self.last_event_time = time.monotonic()
+        self.idle_timer.stop()
+        if self.idle:
+            self.wake()
+
+        # Pick up appearance changes before building any widgets
+        self.styles.refresh()
+
+        now = time.monotonic()
+        self.dps.record_events(damage_events, now)
+        self.damage_stats.record_events(damage_events)
+        for encounter in self.encounters.record_events(damage_events, now):
+            if encounter.ended_by != 'idle':
+                self.dps.end_fight(encounter.monster_name)
+        if self.history is not None:
+            self.history.write(damage_events)
+        if self.column_store is not None:
+            self.column_store.append(damage_events)
+        threshold = self.governor.rollup_threshold(self.config)
+        spell_scope = self.config.rollup_scope == 'spell'
 
         # Group by (category, monster_name)
         categorized_events = {}
         for event in damage_events:
+            if event['type'] == 'death':
+                continue
+            if not self.spells.icon_path(event['spell_name']):
+                # A spell with nothing to show would leave its group a bare label
+                continue
             category = event['category']
             monster_name = event.get('monster_name', event.get('message', 'Unknown'))
 
+            # Fold damage above the per-second threshold into a rollup row
+            if threshold > 0 and event['type'] == 'damage':
+                if spell_scope:
+                    rate_key = (category, event['spell_name'])
+                else:
+                    rate_key = (category, monster_name, event['spell_name'])
+                if self.hit_rates.record(rate_key, now) > threshold:
+                    event = dict(event, rollup=True)
+                    if spell_scope:
+                        monster_name = ROLLUP_GROUP_NAME
+
             key = (category, monster_name)
             if key not in categorized_events:
                 categorized_events[key] = []
             categorized_events[key].append(event)
 
-        for (category, monster_name), events in categorized_events.items():
-            # Instead of using group_index for vertical placement,
-            # we rely on the stored offset in self.category_offsets.
+        for key, events in categorized_events.items():
+            category, monster_name = key
+
+            # The monster keeps one group, with one label and running total
+            group = self.live_groups.get(key)
+            if group is not None:
+                self.grow_group(group, group.stage_events(events))
+                group.place()
+                self.expiry.schedule(group, group.expires_at)
+                continue
+
             group = GroupIndicator(
                 events,
                 self,
-                self.category_offsets[category],
                 self.config,
                 category,
                 monster_name
             )
-            self.groups.append(group)
 
-            # After placing the group, increment the offset for this category
-            # by the amount of space used by this group.
-            self.category_offsets[category] += group.final_group_height() + self.config.padding
+            group.place(self.allocator_for(category).allocate(group.staged_height + self.config.padding))
+            self.groups.add(group)
+            self.live_groups[key] = group
+            self.expiry.schedule(group, group.expires_at)
+
+        self.arm_expiry_timer()
+        if not self.groups:
+            # Nothing went on screen (a death, say); expire_groups will not
+            # run to arm the idle timer, so arm it here
+            self.arm_idle_timer()
+        latency.shown(trace)
+
+    def apply_config_changes(self, changed, previous: Config, spells: SpellTable = None):
+        # The live config has just been updated in place with the settings
+        # named in changed; previous holds their old values, and spells is the
+        # rebuilt spell table if the spell settings changed
+        if spells is not None:
+            self.spells = spells
+        if 'spells' in changed:
+            current = {spell['spell_name']: spell for spell in self.config.spells}
+            self.styles.invalidate_icons(
+                old['icon_path'] for old in previous.spells
+                if old != current.get(old['spell_name'])
+            )
+        if changed & {'font_family', 'total_font_ratio', 'total_color', 'spell_categories'}:
+            self.styles.refresh()
+        if 'frame_budget_ms' in changed:
+            self.governor.budget_ms = self.config.frame_budget_ms
+        if 'start_positions' in changed:
+            if self.compact:
+                for surface in self.surfaces.values():
+                    surface.apply_geometry()
+            else:
+                self.place_category_boxes()
+        if 'dps_readout' in changed:
+            self.update_dps_readout()
+        if 'history_db_path' in changed:
+            self.update_history()
+        if 'column_store_path' in changed:
+            self.update_column_store()
+        if 'debug_hud' in changed and self.config.debug_hud != self.hud_visible:
+            self.toggle_hud()
+        if 'overlay_mode' in changed:
+            print("Overlay mode changes take effect after a restart.")
+
+    def allocator_for(self, category):
+        if category not in self.allocators:
+            self.allocators[category] = SlotAllocator()
+        return self.allocators[category]
+
+    def surface_for(self, category):
+        if not self.compact:
+            return None
+        if category not in self.surfaces:
+            self.surfaces[category] = CategorySurface(category, self.config)
+        return self.surfaces[category]
+
+    def group_origin(self, category, content_width, content_bottom):
+        # Where a group's start position lies in the coordinates of the widgets'
+        # parent; content_bottom is where the group being placed ends
+        if not self.compact:
+            return self.config.start_positions.get(category, (960, 100))
+        surface = self.surface_for(category)
+        surface.fit(content_width, max(content_bottom, self.live_extent(category)))
+        return surface.origin()
+
+    def grow_group(self, group, slot_size):
+        # Resize a live group's span to slot_size. When another group sits
+        # right below it, the groups below are pushed down, each only as far
+        # as the space between them runs out.
+        allocator = self.allocator_for(group.category)
+        if slot_size < group.slot_size:
+            allocator.release(group.category_offset + slot_size, group.slot_size - slot_size)
+            return
+        if allocator.extend(group.category_offset, group.slot_size, slot_size - group.slot_size):
+            return
+        end = group.category_offset + slot_size
+        below = sorted(
+            (other for other in self.groups if other.category == group.category and other.category_offset > group.category_offset),
+            key=lambda other: other.category_offset
+        )
+        for other in below:
+            if other.category_offset >= end:
+                break
+            other.move_to(end)
+            end = other.category_offset + other.slot_size
+        allocator.rebuild(
+            (other.category_offset, slot_size if other is group else other.slot_size)
+            for other in self.groups if other.category == group.category
+        )
+
+    def live_extent(self, category):
+        # Bottom of the category's lowest live group
+        return max((group.category_offset + group.slot_size for group in self.groups if group.category == category), default=0)
+
+    def arm_expiry_timer(self):
+        deadline = self.expiry.next_deadline()
+        if deadline is None:
+            self.expiry_timer.stop()
+            return
+        delay_ms = max(0, int((deadline - time.monotonic()) * 1000) + 1)
+        self.expiry_timer.start(delay_ms)
+
+    @QtCore.pyqtSlot()
+    def expire_groups(self):
+        now = time.monotonic()
+        for group in self.expiry.pop_expired(now):
+            self.retire_group(group)
+        self.hit_rates.prune(now)
+        self.dps.prune(now)
+        self.encounters.close_idle(now)
+        self.arm_expiry_timer()
+        if not self.groups:
+            self.arm_idle_timer()
+
+    def arm_idle_timer(self):
+        remaining = self.last_event_time + self.config.idle_timeout - time.monotonic()
+        self.idle_timer.start(max(0, int(remaining * 1000)))
+
+    @QtCore.pyqtSlot()
+    def enter_idle(self):
+        if self.groups or self.idle:
+            return
+        self.idle = True
+        self.frame_probe.stop()
+        self.expiry_timer.stop()
+        if not self.compact:
+            self.hide()
+        if self.hud_visible:
+            self.hud.stop()
+        if self.dps_readout:
+            self.dps_readout.stop()
+        self.encounters.close_idle(time.monotonic())
+        if self.column_store is not None:
+            self.column_store.flush()
+        self.idle_started = time.monotonic()
+        self.idle_cpu_started = time.process_time()
+
+    def wake(self):
+        self.last_idle_cpu_percent = self.idle_cpu_percent()
+        self.idle = False
+        if not self.compact:
+            self.show()
+        if self.hud_visible:
+            self.hud.start()
+        if self.dps_readout:
+            self.dps_readout.start()
+        self.last_probe = time.monotonic()
+        self.frame_probe.start(FRAME_PROBE_INTERVAL_MS)
+
+    def update_history(self):
+        # Open, switch or close the history database to match the config
+        self.close_history()
+        if self.config.history_db_path:
+            path = os.path.join(self.config.script_dir, self.config.history_db_path)
+            try:
+                self.history = EventHistory(path)
+                print(f"Recording event history to {path}")
+            except sqlite3.Error as e:
+                print(f"Failed to open event history '{path}': {e}")
+
+    def close_history(self):
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+
+    def update_column_store(self):
+        self.close_column_store()
+        if self.config.column_store_path:
+            # column_store loads numpy, so it is only imported when a store is configured
+            from column_store import ColumnStore
+
+            path = os.path.join(self.config.script_dir, self.config.column_store_path)
+            try:
+                self.column_store = ColumnStore(path)
+                print(f"Appending damage events to the column store in {path}")
+            except OSError as e:
+                print(f"Failed to open column store '{path}': {e}")
+
+    def close_column_store(self):
+        if self.column_store is not None:
+            self.column_store.close()
+            self.column_store = None
+
+    def save_damage_stats(self):
+        # Adds this session's distributions to those already saved
+        if not self.config.damage_stats_path:
+            return
+        path = os.path.join(self.config.script_dir, self.config.damage_stats_path)
+        try:
+            merged = DamageSketches.load(path)
+        except FileNotFoundError:
+            merged = DamageSketches()
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Failed to read damage stats '{path}', not saving over it: {e}")
+            return
+        merged.merge(self.damage_stats)
+        try:
+            merged.save(path)
+        except OSError as e:
+            print(f"Failed to save damage stats: {e}")
+
+    def update_dps_readout(self):
+        # Show or drop the readout to match the config
+        if self.config.dps_readout and self.dps_readout is None:
+            self.dps_readout = DpsReadout(self.config, self.dps, self.damage_stats)
+            if not self.idle:
+                self.dps_readout.start()
+        elif not self.config.dps_readout and self.dps_readout is not None:
+            self.dps_readout.stop()
+            self.dps_readout.deleteLater()
+            self.dps_readout = None
+
+    def toggle_hud(self):
+        self.hud_visible = not self.hud_visible
+        if self.hud_visible:
+            if self.hud is None:
+                self.hud = DebugHud(self.config)
+            self.hud.start()
+        elif self.hud:
+            self.hud.stop()
+
+    def idle_cpu_percent(self):
+        # Process CPU time over wall time for the current (or last) idle spell
+        if not self.idle:
+            return self.last_idle_cpu_percent
+        wall = time.monotonic() - self.idle_started
+        if wall <= 0:
+            return 0.0
+        return (time.process_time() - self.idle_cpu_started) / wall * 100
 
-        self.cleanup_groups()
+    @QtCore.pyqtSlot()
+    def sample_frame_time(self):
+        now = time.monotonic()
+        lag_ms = (now - self.last_probe) * 1000 - FRAME_PROBE_INTERVAL_MS
+        self.last_probe = now
+        if self.governor.record(max(0.0, lag_ms)):
+            print(f"Overlay quality: {self.governor.level_name} (lag {self.governor.frame_ms:.1f} ms)")
 
-    def cleanup_groups(self):
-        active_groups = [g for g in self.groups if g.is_active()]
-        self.groups = active_groups
+    def retire_group(self, group):
+        allocator = self.allocator_for(group.category)
+        allocator.release(group.category_offset, group.slot_size)
+        self.groups.discard(group)
+        if self.compact:
+            self.surface_for(group.category).shrink(self.live_extent(group.category))
+        key = (group.category, group.monster_name)
+        if self.live_groups.get(key) is group:
+            del self.live_groups[key]
+        group.teardown()
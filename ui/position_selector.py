@@ -1,7 +1,10 @@
 from PyQt5 import QtCore, QtGui, QtWidgets
 from PyQt5.QtCore import pyqtSignal, Qt, QPoint, QSize
 from PyQt5.QtWidgets import QDialog, QLabel
-from PyQt5.QtGui import QPainter, QColor, QPen
+from PyQt5.QtGui import QPainter, QColor, QPen, QPixmap
+
+# Half the current box's pen width, rounded up, so dirty rects cover its outline
+BOX_PEN_MARGIN = 2
 
 
 class PositionSelectorWindow(QDialog):
@@ -20,9 +23,10 @@ class PositionSelectorWindow(QDialog):
         )
         self.setModal(True)
         self.setAttribute(Qt.WA_TranslucentBackground)
+        self.box_size = QSize(100, 100)
+        self.background = None
         self.showFullScreen()
 
-        self.box_size = QSize(100, 100)
         self.box_pos = QPoint(
             (self.width() - self.box_size.width()) // 2,
             (self.height() - self.box_size.height()) // 2
@@ -44,8 +48,15 @@ class PositionSelectorWindow(QDialog):
         )
         self.instructions.setAttribute(Qt.WA_TransparentForMouseEvents)
 
-    def paintEvent(self, event):
-        painter = QPainter(self)
+    def rebuild_background(self):
+        # The dimmed screen and the other categories' boxes never change while
+        # dragging, so they are drawn once and blitted back per dirty rect
+        ratio = self.devicePixelRatioF()
+        self.background = QPixmap(self.size() * ratio)
+        self.background.setDevicePixelRatio(ratio)
+        self.background.fill(Qt.transparent)
+
+        painter = QPainter(self.background)
         painter.setRenderHint(QPainter.Antialiasing)
         painter.fillRect(self.rect(), QColor(0, 0, 0, 100))
 
@@ -57,16 +68,42 @@ class PositionSelectorWindow(QDialog):
                 continue
             rect = QtCore.QRect(QPoint(pos[0] - self.box_size.width()//2, pos[1] - self.box_size.height()//2), self.box_size)
             painter.drawRect(rect)
+        painter.end()
+
+    def box_rect(self):
+        return QtCore.QRect(self.box_pos, self.box_size)
+
+    def box_dirty_rect(self):
+        margin = BOX_PEN_MARGIN
+        return self.box_rect().adjusted(-margin, -margin, margin, margin)
+
+    def resizeEvent(self, event):
+        self.rebuild_background()
+        super().resizeEvent(event)
+
+    def paintEvent(self, event):
+        if self.background is None:
+            self.rebuild_background()
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+
+        # Copy the cached background straight over the dirty area
+        dirty = event.rect()
+        ratio = self.background.devicePixelRatio()
+        painter.setCompositionMode(QPainter.CompositionMode_Source)
+        painter.drawPixmap(dirty, self.background, QtCore.QRect(dirty.topLeft() * ratio, dirty.size() * ratio))
+        painter.setCompositionMode(QPainter.CompositionMode_SourceOver)
 
         # Draw the draggable box for the current category
-        painter.setPen(QPen(QColor(255, 0, 0), 3))
-        painter.setBrush(QColor(255, 0, 0, 100))
-        painter.drawRect(QtCore.QRect(self.box_pos, self.box_size))
+        if self.box_dirty_rect().intersects(dirty):
+            painter.setPen(QPen(QColor(255, 0, 0), 3))
+            painter.setBrush(QColor(255, 0, 0, 100))
+            painter.drawRect(self.box_rect())
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            box_rect = QtCore.QRect(self.box_pos, self.box_size)
-            if box_rect.contains(event.pos()):
+            if self.box_rect().contains(event.pos()):
                 self.dragging = True
                 self.drag_offset = event.pos() - self.box_pos
                 event.accept()
@@ -78,8 +115,10 @@ class PositionSelectorWindow(QDialog):
             new_pos = event.pos() - self.drag_offset
             new_x = max(0, min(new_pos.x(), self.width() - self.box_size.width()))
             new_y = max(0, min(new_pos.y(), self.height() - self.box_size.height()))
+            # Repaint only where the box was and where it is now
+            old_rect = self.box_dirty_rect()
             self.box_pos = QPoint(new_x, new_y)
-            self.update()
+            self.update(old_rect.united(self.box_dirty_rect()))
 
     def mouseReleaseEvent(self, event):
         if event.button() == Qt.LeftButton:
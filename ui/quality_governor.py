@@ -0,0 +1,63 @@
+from PyQt5.QtCore import Qt
+
+# Quality levels in the order they are given up under load
+QUALITY_LEVELS = ['full', 'short_animation', 'no_fade', 'fast_scaling', 'forced_rollup']
+
+
+class QualityGovernor:
+    # Watches smoothed event-loop lag against Config.frame_budget_ms. It steps
+    # down one level at a time while the budget is blown and steps back up
+    # once lag stays well under it, so a single slow frame does not make it flap.
+    def __init__(self, budget_ms, step_down_after=5, step_up_after=40, smoothing=0.2):
+        self.budget_ms = budget_ms
+        self.step_down_after = step_down_after
+        self.step_up_after = step_up_after
+        self.smoothing = smoothing
+        self.level = 0
+        self.frame_ms = 0.0
+        self._over = 0
+        self._under = 0
+
+    @property
+    def level_name(self):
+        return QUALITY_LEVELS[self.level]
+
+    def record(self, frame_ms):
+        # Feed one frame-time sample; returns True when the level changed
+        self.frame_ms += (frame_ms - self.frame_ms) * self.smoothing
+
+        if self.frame_ms > self.budget_ms:
+            self._over += 1
+            self._under = 0
+            if self._over >= self.step_down_after and self.level < len(QUALITY_LEVELS) - 1:
+                self.level += 1
+                self._over = 0
+                return True
+        elif self.frame_ms < self.budget_ms / 2:
+            self._under += 1
+            self._over = 0
+            if self._under >= self.step_up_after and self.level > 0:
+                self.level -= 1
+                self._under = 0
+                return True
+        else:
+            self._over = 0
+            self._under = 0
+        return False
+
+    def animation_duration(self, config):
+        if self.level >= 1:
+            return config.animation_duration // 2
+        return config.animation_duration
+
+    def fade_enabled(self):
+        return self.level < 2
+
+    def transform_mode(self):
+        return Qt.FastTransformation if self.level >= 3 else Qt.SmoothTransformation
+
+    def rollup_threshold(self, config):
+        # At the last level every spell is rolled up from its second hit per second
+        if self.level >= 4:
+            return 1
+        return config.rollup_threshold
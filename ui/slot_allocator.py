@@ -0,0 +1,97 @@
+from bisect import bisect_left, insort
+
+
+class SlotAllocator:
+    # Hands out vertical spans (offset, size) below a category's start position
+    # and takes them back when groups expire. Free space is kept as coalesced
+    # holes indexed both by start (for merging neighbours) and by size (for an
+    # O(log n) best-fit lookup). Holes touching the end of the stack are
+    # trimmed so the stack shrinks back to zero once everything has faded.
+    def __init__(self):
+        self.high_water = 0
+        self._holes_by_start = []   # sorted (start, size)
+        self._holes_by_size = []    # sorted (size, start)
+
+    def allocate(self, size):
+        size = max(0, int(size))
+        i = bisect_left(self._holes_by_size, (size, -1))
+        if i < len(self._holes_by_size):
+            hole_size, hole_start = self._holes_by_size[i]
+            self._remove_hole(hole_start, hole_size)
+            if hole_size > size:
+                self._add_hole(hole_start + size, hole_size - size)
+            return hole_start
+
+        offset = self.high_water
+        self.high_water += size
+        return offset
+
+    def extend(self, offset, size, extra):
+        # Grow the span at offset in place if the space right below it is
+        # free. Returns False when another span is in the way.
+        if extra <= 0:
+            return True
+        end = offset + size
+        if end == self.high_water:
+            self.high_water += extra
+            return True
+
+        i = bisect_left(self._holes_by_start, (end, -1))
+        if i < len(self._holes_by_start):
+            hole_start, hole_size = self._holes_by_start[i]
+            if hole_start == end and hole_size >= extra:
+                self._remove_hole(hole_start, hole_size)
+                if hole_size > extra:
+                    self._add_hole(end + extra, hole_size - extra)
+                return True
+        return False
+
+    def release(self, offset, size):
+        if size <= 0:
+            return
+        start, end = offset, offset + size
+
+        # Merge with the hole directly above
+        i = bisect_left(self._holes_by_start, (start, -1))
+        if i > 0:
+            prev_start, prev_size = self._holes_by_start[i - 1]
+            if prev_start + prev_size == start:
+                self._remove_hole(prev_start, prev_size)
+                start = prev_start
+
+        # Merge with the hole directly below
+        i = bisect_left(self._holes_by_start, (end, -1))
+        if i < len(self._holes_by_start):
+            next_start, next_size = self._holes_by_start[i]
+            if next_start == end:
+                self._remove_hole(next_start, next_size)
+                end = next_start + next_size
+
+        if end >= self.high_water:
+            self.high_water = start
+        else:
+            self._add_hole(start, end - start)
+
+    def rebuild(self, spans):
+        # Start over from the (offset, size) spans in use, with the space
+        # between them as holes
+        self.reset()
+        cursor = 0
+        for offset, size in sorted(spans):
+            if offset > cursor:
+                self._add_hole(cursor, offset - cursor)
+            cursor = max(cursor, offset + size)
+        self.high_water = cursor
+
+    def reset(self):
+        self.high_water = 0
+        self._holes_by_start.clear()
+        self._holes_by_size.clear()
+
+    def _add_hole(self, start, size):
+        insort(self._holes_by_start, (start, size))
+        insort(self._holes_by_size, (size, start))
+
+    def _remove_hole(self, start, size):
+        del self._holes_by_start[bisect_left(self._holes_by_start, (start, size))]
+        del self._holes_by_size[bisect_left(self._holes_by_size, (size, start))]
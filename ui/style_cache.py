@@ -0,0 +1,103 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetrics, QPixmap
+from config import Config
+from .glyph_atlas import GlyphAtlas
+
+
+class TextStyle:
+    __slots__ = ('font', 'metrics', 'color', 'atlas')
+
+    def __init__(self, font_family, font_size, color):
+        self.font = QFont(font_family, font_size)
+        self.color = QColor(color)
+        self.metrics = QFontMetrics(self.font)
+        self.atlas = GlyphAtlas(self.font, self.color, self.metrics)
+
+
+class StyleCache:
+    # Ready-made fonts, colors, metrics and glyph atlases for each
+    # category's text roles ('text', 'monster_name', 'total') plus scaled
+    # spell icons, so indicators never parse a stylesheet or resolve a font
+    # while hits are arriving. refresh() rebuilds a category only when its
+    # appearance settings change, and everything when the font does.
+    def __init__(self, config: Config):
+        self.config = config
+        self._shared_signature = None
+        self._signatures = {}
+        self._styles = {}
+        self._icons = {}
+        self.refresh()
+
+    def shared_signature(self):
+        return (self.config.font_family, self.config.total_font_ratio, self.config.total_color)
+
+    def category_signature(self, category):
+        return tuple(sorted(self.config.spell_categories[category].items()))
+
+    def refresh(self):
+        shared_signature = self.shared_signature()
+        if shared_signature != self._shared_signature:
+            self._shared_signature = shared_signature
+            self._signatures = {}
+
+        rebuilt = False
+        for category in self.config.spell_categories:
+            signature = self.category_signature(category)
+            if self._signatures.get(category) != signature:
+                self._signatures[category] = signature
+                self._styles[category] = self.build_styles(category)
+                rebuilt = True
+
+        for category in list(self._styles):
+            if category not in self.config.spell_categories:
+                del self._styles[category]
+                del self._signatures[category]
+                rebuilt = True
+        if rebuilt:
+            self.prune_icons()
+
+    def build_styles(self, category):
+        font_family = self.config.font_family
+        cat_conf = self.config.spell_categories[category]
+        return {
+            'text': TextStyle(font_family, cat_conf['font_size'], cat_conf['text_color']),
+            'monster_name': TextStyle(
+                font_family,
+                cat_conf.get('monster_name_font_size', 24),
+                cat_conf.get('monster_name_text_color', 'white')
+            ),
+            'total': TextStyle(
+                font_family,
+                int(cat_conf['font_size'] * self.config.total_font_ratio),
+                self.config.total_color
+            ),
+        }
+
+    def prune_icons(self):
+        # Drop icons scaled to a size no category uses any more
+        sizes = {(conf['icon_width'], conf['icon_height']) for conf in self.config.spell_categories.values()}
+        self._icons = {key: pixmap for key, pixmap in self._icons.items() if key[1:3] in sizes}
+
+    def invalidate_icons(self, paths):
+        # Forget the cached pixmaps of icon files that were changed or replaced
+        paths = set(paths)
+        self._icons = {key: pixmap for key, pixmap in self._icons.items() if key[0] not in paths}
+
+    def style(self, category, role):
+        return self._styles[category][role]
+
+    def measure(self, category, role, text):
+        # Measured the same way GlyphLabel lays the text out
+        atlas = self.style(category, role).atlas
+        return atlas.layout(text)[1], atlas.height
+
+    def icon(self, path, width, height, transform_mode=Qt.SmoothTransformation):
+        key = (path, width, height, transform_mode)
+        pixmap = self._icons.get(key)
+        if pixmap is None:
+            pixmap = QPixmap(path)
+            if pixmap.isNull():
+                print(f"Failed to load icon: {path}")
+            pixmap = pixmap.scaled(width, height, Qt.KeepAspectRatio, transform_mode)
+            self._icons[key] = pixmap
+        return pixmap
@@ -34,3 +34,19 @@ def show_error_message(title, message):
 
 def signal_handler(sig, frame):
     QApplication.quit()
+
+
+def process_rss_bytes():
+    # Resident set size of this process, or None where it cannot be read
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current RSS here; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024